@@ -0,0 +1,173 @@
+# LIBRARIES NEEDED
+
+import pandas as pd
+
+import utils as lf
+
+# Team form and head-to-head analytics over the fixtures table of get_matches(). Played matches are indexed once
+# per team (in date order, with running points) and per pair of teams, so queries are answered from memory
+# without touching the network, and new matches only update the entries they touch.
+
+# Result of a match from the team's perspective -> points
+POINTS = {'W': 3, 'R': 1, 'P': 0}
+
+TOTALS = ['matches', 'wins', 'draws', 'losses', 'goals_for', 'goals_against', 'points']
+
+class MatchIndex:
+    """
+    Per-team match sequences, home/away splits and a pairwise head-to-head index of played matches.
+    """
+
+    def __init__(self):
+        self.match_keys = set()
+        self.sequences = {}  # team -> list of match entries in date order
+        self.cumulative_points = {}  # team -> points after each entry of its sequence, for rolling averages
+        self.splits = {}  # (team, 'home' or 'away') -> totals
+        self.head_to_head = {}  # (team, opponent) -> totals from the team's perspective
+
+    # UPDATING
+
+    def add_matches(self, matches, league=None):
+        """
+        Adds played matches to the index. Matches already indexed and matches without a score are skipped, so
+        the whole fixtures table can be passed again after every round.
+
+        Parameters:
+        - matches (pandas.DataFrame): The output of get_matches() (plain or typed).
+        - league (str or None): The league of the matches, part of their identity when several leagues are added.
+
+        Returns:
+        - int: The number of matches added.
+        """
+        # The score column has no header on the site (see utils.score_column())
+        position = lf.score_column(matches)
+        scores = matches.iloc[:, position] if position is not None else [None] * len(matches)
+        new = []
+        for (round_, date, hour, home, away), score in zip(
+                matches[['Kol.', 'Data', 'Godz.', 'Gospodarz', 'Gość']].itertuples(index=False), scores):
+            home_goals, away_goals = lf.split_score(score)
+            key = (league, str(round_), str(home), str(away))
+            if home_goals is None or key in self.match_keys:
+                continue
+            self.match_keys.add(key)
+            new.append((f'{pd.Timestamp(date):%Y-%m-%d} {hour}', round_, str(home), str(away), home_goals, away_goals))
+
+        # get_matches() lists the latest round first; in date order every match is appended at the end
+        for when, round_, home, away, home_goals, away_goals in sorted(new, key=lambda match: match[0]):
+            self._add_side(home, away, home_goals, away_goals, 'home', when, round_, league)
+            self._add_side(away, home, away_goals, home_goals, 'away', when, round_, league)
+        return len(new)
+
+    def ingest_league(self, league, ligi=lf.ligi, workers=None, season=None):
+        """
+        Downloads the fixtures of a league with get_matches() and adds the played matches.
+
+        Returns:
+        - int: The number of matches added.
+        """
+        matches = lf.get_matches(league, ligi=ligi, workers=workers, season=season)
+        return self.add_matches(matches, league)
+
+    def _add_side(self, team, opponent, goals_for, goals_against, venue, when, round_, league):
+        result = 'W' if goals_for > goals_against else 'R' if goals_for == goals_against else 'P'
+        entry = {'when': when, 'round': round_, 'league': league, 'opponent': opponent, 'venue': venue,
+                 'goals_for': goals_for, 'goals_against': goals_against, 'result': result}
+
+        # Zwykle mecz jest najnowszy i trafia na koniec; zaległy mecz trafia na swoje miejsce, a sumy
+        # punktów są przeliczane od niego
+        sequence = self.sequences.setdefault(team, [])
+        points = self.cumulative_points.setdefault(team, [])
+        position = len(sequence)
+        while position and sequence[position - 1]['when'] > when:
+            position -= 1
+        sequence.insert(position, entry)
+        del points[position:]
+        for item in sequence[position:]:
+            points.append((points[-1] if points else 0) + POINTS[item['result']])
+
+        for totals in (self.splits.setdefault((team, venue), _empty_totals()),
+                       self.head_to_head.setdefault((team, opponent), _empty_totals())):
+            _add_to_totals(totals, entry)
+
+    # QUERIES
+
+    def form(self, team, n=5):
+        """
+        Returns the results of the last n matches of a team, the latest first ('W' win, 'R' draw, 'P' loss).
+        """
+        return [entry['result'] for entry in reversed(self.sequences.get(team, [])[-n:])]
+
+    def last_matches(self, team, n=5):
+        """
+        Returns the last n matches of a team, the latest first, with the date, round, opponent, venue, goals and
+        result.
+        """
+        entries = list(reversed(self.sequences.get(team, [])[-n:]))
+        return pd.DataFrame(entries, columns=['when', 'round', 'league', 'opponent', 'venue', 'goals_for',
+                                              'goals_against', 'result'])
+
+    def h2h(self, team, opponent):
+        """
+        Returns the head-to-head record of team against opponent.
+
+        Returns:
+        - dict: 'matches', 'wins', 'draws', 'losses', 'goals_for', 'goals_against' and 'points' of team.
+        """
+        return dict(self.head_to_head.get((team, opponent), _empty_totals()))
+
+    def home_away(self, team):
+        """
+        Returns the totals of a team at home and away.
+
+        Returns:
+        - pandas.DataFrame: Rows 'home' and 'away', columns as in h2h() plus 'points_per_game'.
+        """
+        df = pd.DataFrame([self.splits.get((team, venue), _empty_totals()) for venue in ['home', 'away']],
+                          index=['home', 'away'], columns=TOTALS)
+        df['points_per_game'] = df['points'] / df['matches'].where(df['matches'] > 0)
+        return df
+
+    def points_per_game(self, team, n=None):
+        """
+        Returns the average points of a team over its last n matches (all matches when n is None), or None when
+        it has not played yet.
+        """
+        points = self.cumulative_points.get(team, [])
+        if not points:
+            return None
+        n = len(points) if n is None else min(n, len(points))
+        before = points[-n - 1] if n < len(points) else 0
+        return (points[-1] - before) / n
+
+    def rolling_points_per_game(self, team, window=5):
+        """
+        Returns the average points over the last 'window' matches after every match of a team.
+
+        Returns:
+        - pandas.Series: Indexed by the date and hour of the matches, in date order.
+        """
+        sequence = self.sequences.get(team, [])
+        points = pd.Series(self.cumulative_points.get(team, []), index=[entry['when'] for entry in sequence],
+                           dtype='float64')
+        counts = pd.Series(range(1, len(points) + 1), index=points.index).clip(upper=window)
+        return (points - points.shift(window, fill_value=0)) / counts
+
+    def teams(self):
+        """
+        Returns the names of all indexed teams.
+        """
+        return sorted(self.sequences)
+
+# ASIDE FUNCTIONS
+
+def _empty_totals():
+    return dict.fromkeys(TOTALS, 0)
+
+def _add_to_totals(totals, entry):
+    totals['matches'] += 1
+    totals['wins'] += entry['result'] == 'W'
+    totals['draws'] += entry['result'] == 'R'
+    totals['losses'] += entry['result'] == 'P'
+    totals['goals_for'] += entry['goals_for']
+    totals['goals_against'] += entry['goals_against']
+    totals['points'] += POINTS[entry['result']]
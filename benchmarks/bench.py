@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Offline benchmark of the scrapers in utils.py.
+#
+# Hand-built pages with the layout of ligafanow.pl (as seen in the notebooks) from benchmarks/fixtures are replayed
+# by a local HTTP server, so every function goes through the real fetch and parse path without touching the site.
+# For each case the harness reports latency, the part of it spent on HTTP and on parsing, the request count and
+# peak memory, and compares them with benchmarks/baseline.json. With --check it instead verifies that the
+# scrapers read the expected values from the pages.
+#
+# Usage:
+#   python benchmarks/bench.py                  run and compare with the baseline
+#   python benchmarks/bench.py --save-baseline  run and store the results as the new baseline
+#   python benchmarks/bench.py --check          check the scraped values on the fixture pages
+#   python benchmarks/bench.py --record         replace the pages with the live ones listed in manifest.json
+
+# LIBRARIES NEEDED
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pandas as pd
+from requests.adapters import HTTPAdapter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import analytics  # noqa: E402
+import crawler  # noqa: E402
+import database  # noqa: E402
+import leaderboards  # noqa: E402
+import utils as lf  # noqa: E402
+
+FIXTURES = os.path.join(HERE, 'fixtures')
+MANIFEST = os.path.join(FIXTURES, 'manifest.json')
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+LEAGUE = '8liga'
+TEAM = 'Kozice Warszawa'
+TEAM_URL = 'https://ligafanow.pl/druzyna/3100/kozice-warszawa'
+MATCHES_URL = 'https://ligafanow.pl/druzyna/mecze/3100/kozice-warszawa'
+REPORT_URL = 'https://ligafanow.pl/statystyki/raport/52001'
+
+# LOCAL STAND-IN
+
+def load_manifest():
+    with open(MANIFEST, encoding='utf-8') as f:
+        return json.load(f)
+
+def _route(url):
+    # reports_links() builds addresses with a double slash ('https://ligafanow.pl//statystyki/raport/...')
+    parts = urlsplit(url)
+    return re.sub('/+', '/', parts.path) + ('?' + parts.query if parts.query else '')
+
+class FixtureServer:
+    """
+    Local HTTP server replaying the fixture pages, keyed by path and query of their original address.
+    """
+
+    def __init__(self, manifest=None):
+        manifest = manifest or load_manifest()
+        pages = {}
+        for url, name in manifest.items():
+            with open(os.path.join(FIXTURES, name), 'rb') as f:
+                pages[_route(url)] = f.read()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = pages.get(self.path)
+                self.send_response(200 if body is not None else 404)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body or b'')))
+                self.end_headers()
+                self.wfile.write(body or b'')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        # the rate limit protects the live site and would dominate the local timings
+        self.rate_limit = lf.HTTP_CONFIG['rate_limit']
+        lf.configure_session(rate_limit=None)
+        lf.get_session().mount('https://ligafanow.pl/', StandInAdapter(self.base))
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        lf.configure_session(rate_limit=self.rate_limit)  # also drops the session with the stand-in adapter
+
+class StandInAdapter(HTTPAdapter):
+    """
+    Transport adapter that sends requests for ligafanow.pl to the local FixtureServer instead.
+    """
+
+    def __init__(self, base, **kwargs):
+        self.base = base
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        request.url = self.base + _route(request.url)
+        return super().send(request, **kwargs)
+
+# CASES
+
+def _raw_form():
+    # team_form_df() works on the raw 'Forma' text, before get_table() turns it into event types
+    page = lf.league_page(LEAGUE)
+    row = page.text_rows[1]
+    return pd.DataFrame({'Zespół': [row[1]], 'Forma': [row[-1]]})
+
+def _form_rows():
+    # The strings team_form_df() passes to string_divide()
+    rows = re.split(r'([PWR])\s+(\d{4}-\d{2}-\d{2} \d{2}:\d{2})', _raw_form()['Forma'][0])[1:]
+    return lf.triple_strings(rows)
+
+def _divide_rows(rows):
+    return [lf.string_divide(row) for row in rows]
+
+# Every case builds its input and returns the callable that is timed. Inputs read from a fixture page are built
+# here, once, so their download and parsing are not part of the measurement.
+CASES = {
+    'get_table': lambda: partial(lf.get_table, LEAGUE),
+    'take_table_results': lambda: partial(lf.take_table_results, MATCHES_URL),
+    'extract_team': lambda: partial(lf.extract_team, TEAM_URL),
+    'match_details': lambda: partial(lf.match_details, REPORT_URL),
+    'team_form_df': lambda: partial(lf.team_form_df, _raw_form(), TEAM),
+    'string_divide': lambda: partial(_divide_rows, _form_rows()),
+}
+
+def run_case(case, repeat):
+    """
+    Prepares one case, runs it repeat times inside utils.profile() and measures it.
+
+    Returns:
+    - dict: Median 'seconds', 'fetch_seconds' (HTTP), 'parse_seconds' (HTML parsing), 'frame_seconds' (DataFrame
+      building) and 'other_seconds' (the rest) per run, 'requests' per run and 'peak_kb'.
+    """
+    func = case()
+    func()  # warm up connections and imports
+    runs = []
+    requests = 0
+    for _ in range(repeat):
+        lf.clear_fetch_log()
+        with lf.profile('bench') as stats:
+            func()
+        runs.append({'seconds': stats.seconds, 'fetch_seconds': sum(entry['seconds'] for entry in lf.fetch_log),
+                     'parse_seconds': stats.parse_seconds, 'frame_seconds': stats.frame_seconds,
+                     'other_seconds': stats.other_seconds()})
+        requests = len(lf.fetch_log)
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {column: statistics.median(run[column] for run in runs) for column in runs[0]}
+    return {**result, 'requests': requests, 'peak_kb': peak / 1024}
+
+def run(repeat=20, cases=None):
+    """
+    Runs the selected cases against the local stand-in.
+
+    Parameters:
+    - repeat (int): The number of measured runs per case.
+    - cases (list of str or None): The names of the cases to run. Defaults to all of CASES.
+
+    Returns:
+    - pandas.DataFrame: One row per case, indexed by case name.
+    """
+    lf.disable_cache()
+    results = {}
+    with FixtureServer():
+        for name in cases or list(CASES):
+            results[name] = run_case(CASES[name], repeat)
+    return pd.DataFrame.from_dict(results, orient='index')
+
+def compare(results, baseline, tolerance=0.25, min_delta=0.002):
+    """
+    Compares results with a baseline. A case regresses when it is more than tolerance (and at least min_delta
+    seconds) slower or makes more requests than in the baseline.
+
+    Returns:
+    - pandas.DataFrame: The results with the baseline latency, the relative change and a 'regression' flag.
+    """
+    df = results.copy()
+    df['baseline_seconds'] = [baseline.get(name, {}).get('seconds') for name in df.index]
+    baseline_requests = [baseline.get(name, {}).get('requests') for name in df.index]
+    df['change'] = df['seconds'] / df['baseline_seconds'].astype(float) - 1
+    slower = (df['change'].fillna(0) > tolerance) & (df['seconds'] - df['baseline_seconds'].fillna(df['seconds']) > min_delta)
+    more_requests = pd.Series([base is not None and requests > base
+                               for requests, base in zip(df['requests'], baseline_requests)], index=df.index)
+    df['regression'] = slower | more_requests
+    return df
+
+# CHECKS
+#
+# Values the scrapers must read from the fixture pages. Only the pages of TEAM are recorded, so the league-wide
+# functions are called with errors= and skip the other teams.
+
+def check_typed_matches():
+    matches = lf.get_matches(LEAGUE, team=TEAM, typed=True, errors=[])
+    played = matches[matches['Bramki gospodarza'].notna()]
+    assert len(played) == 9 and played['Bramki gościa'].notna().all(), 'scores of played matches not split'
+    first = matches[matches['Kol.'] == 1].iloc[0]
+    assert (first['Bramki gospodarza'], first['Bramki gościa']) == (4, 0), 'wrong goals in round 1'
+    assert matches.loc[matches['Bramki gospodarza'].isna(), 'Kol.'].min() == 10, 'unplayed match with goals'
+
+def check_typed_concat():
+    table = lf.get_table(LEAGUE)
+    halves = pd.concat([lf.apply_schema(table.iloc[:7], 'table'), lf.apply_schema(table.iloc[7:], 'table')])
+    assert halves.dtypes.equals(lf.apply_schema(table, 'table').dtypes), 'dtypes lost when typed frames are joined'
+    squad = lf.get_squad_details(LEAGUE, TEAM, typed=True)
+    assert set(squad.columns) <= set(lf.SCHEMAS['squad']), 'squad columns without a declared dtype'
+
+def check_database():
+    db = database.LeagueDB(':memory:')
+    db.ingest_league(LEAGUE, squads=False, errors=[])
+    matches = db.team_matches(TEAM, LEAGUE)
+    assert matches['home_goals'].notna().sum() == 9, 'goals of played matches not stored'
+    events = db.query('SELECT team, player, stat, value FROM report_events WHERE match_id = ?', ('52001',))
+    assert events.groupby('team')['player'].nunique().min() > 1, 'report rows collapsed into one player per team'
+    goals = events[(events['player'] == 'Alli Abdullahi') & (events['stat'] == 'Bramka')]['value']
+    assert goals.tolist() == [2], 'wrong goals of a player in the report'
+
+def check_match_index():
+    index = analytics.MatchIndex()
+    added = index.add_matches(lf.get_matches(LEAGUE, team=TEAM, errors=[]), LEAGUE)
+    assert added == 9, 'played matches not indexed'
+    assert index.form(TEAM) == ['R', 'W', 'W', 'W', 'W'], 'wrong form'
+    assert index.h2h(TEAM, 'Stal Białołęka')['goals_for'] == 4, 'wrong head-to-head goals'
+
+def check_leaderboards():
+    boards = leaderboards.Leaderboards()
+    assert boards.ingest_league(LEAGUE, errors=[]) == 1, 'the fixture report was not added'
+    top = boards.leaderboard('goals', LEAGUE, n=1).iloc[0]
+    assert (top['player'], top['goals']) == ('Alli Abdullahi', 2), 'wrong top scorer'
+    assert boards.leaderboard('yellow_cards', n=None)['yellow_cards'].sum() == 3, 'wrong number of yellow cards'
+
+def check_crawler():
+    crawl = crawler.Crawler()
+    crawl.add(lf.ligi[LEAGUE], 'league')
+    frames = crawl.run()
+    assert len(frames['matches']) > 0, 'matches pages not followed'
+    lost = crawl.error_report()
+    assert (lost['kind'] == 'team').sum() == 13, 'team pages without a squad not reported'
+
+def check_matches_details():
+    errors = []
+    lf.clear_fetch_log()
+    details = lf.get_matches_details(LEAGUE, [(TEAM, 1), ('Nieznany Zespół', 1)], errors=errors)
+    assert details['match_id'].unique().tolist() == ['52001'], 'an unknown team stopped the batch'
+    reports = [entry for entry in lf.fetch_log if '/raport/' in entry['url']]
+    assert len(reports) == 1, 'reports downloaded beyond the selected match'
+    assert [error['key'] for error in errors] == [('Nieznany Zespół', 1)], 'unresolved key not in errors'
+
+def check_season_leagues():
+    links = lf.parse_season_links(lf.fetch(lf.ligi[LEAGUE]).text)
+    assert lf.links_leagues(links, 30) == lf.ligi, 'menu entries not named as in ligi'
+    renumbered = [('29', str(int(division) + 100), 'x') for _, division, _ in links]
+    try:
+        lf.links_leagues(renumbered, 29)
+    except KeyError:
+        pass
+    else:
+        raise AssertionError('unnamed divisions given a guessed league')
+    keys = {division: name for (_, division, _), name in zip(renumbered, lf.ligi)}
+    assert lf.links_leagues(renumbered, 29, keys=keys)['ekstraklasa'].endswith('/29/335'), 'keys= not applied'
+
+CHECKS = {
+    'typed_matches': check_typed_matches,
+    'typed_concat': check_typed_concat,
+    'database': check_database,
+    'match_index': check_match_index,
+    'leaderboards': check_leaderboards,
+    'crawler': check_crawler,
+    'matches_details': check_matches_details,
+    'season_leagues': check_season_leagues,
+}
+
+def check(names=None):
+    """
+    Runs the selected checks against the local stand-in.
+
+    Returns:
+    - dict: Check name -> None when it passed, or the error message.
+    """
+    lf.disable_cache()
+    failures = {}
+    with FixtureServer():
+        for name in names or list(CHECKS):
+            try:
+                CHECKS[name]()
+                failures[name] = None
+            except Exception as error:  # a failing check must not hide the others
+                failures[name] = str(error) if isinstance(error, AssertionError) else repr(error)
+    return failures
+
+def record(manifest=None):
+    """
+    Downloads the pages listed in manifest.json from the live site and stores them as fixtures.
+    """
+    manifest = manifest or load_manifest()
+    for url, name in manifest.items():
+        with open(os.path.join(FIXTURES, name), 'wb') as f:
+            f.write(lf.fetch(url).content)
+        print(f'recorded {url} -> {name}')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark of the scrapers in utils.py')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--case', action='append', choices=list(CASES))
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--record', action='store_true')
+    parser.add_argument('--check', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.check:
+        failures = check()
+        for name, failure in failures.items():
+            print(f'{name}: {failure or "ok"}')
+        return 1 if any(failures.values()) else 0
+
+    if args.record:
+        record()
+        return 0
+
+    results = run(args.repeat, args.case)
+    pd.set_option('display.width', 200)
+    if args.save_baseline:
+        with open(BASELINE, 'w', encoding='utf-8') as f:
+            json.dump(results.to_dict(orient='index'), f, indent=4)
+        print(results.to_string(float_format='{:.6f}'.format))
+        print(f'baseline saved to {BASELINE}')
+        return 0
+
+    if not os.path.exists(BASELINE):
+        print(results.to_string(float_format='{:.6f}'.format))
+        print('no baseline yet, run with --save-baseline to store one')
+        return 0
+    with open(BASELINE, encoding='utf-8') as f:
+        report = compare(results, json.load(f), args.tolerance)
+    print(report.to_string(float_format='{:.6f}'.format))
+    return 1 if report['regression'].any() else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,367 @@
+# LIBRARIES NEEDED
+
+import asyncio
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import pandas as pd
+
+import utils as lf
+
+# Asynchronous whole-site crawler. Pages wait in a priority queue, each host gets its own concurrency and rate
+# limit, every URL is visited once per run and progress can be checkpointed to disk so an interrupted crawl
+# resumes where it stopped. Downloads go through utils.fetch() (in worker threads), so the shared session, the
+# response cache and the fetch log are used as everywhere else.
+
+# Lower numbers are crawled first: reports are taken as soon as they are discovered, so results arrive early
+# and the queue stays short
+PRIORITIES = {'report': 0, 'matches': 1, 'team': 2, 'league': 3}
+
+BASE_URL = 'https://ligafanow.pl/'
+
+# PAGE HANDLERS
+#
+# A handler receives the page address and source and returns the parsed data (a DataFrame or None) and a list of
+# (url, kind) pairs of pages to crawl next. A handler that could read only part of its page raises PartialPage
+# with what it did read, so the links are still followed and the lost data is reported in Crawler.errors.
+
+class PartialPage(Exception):
+    """
+    Raised by a handler whose page was read only in part.
+
+    Parameters:
+    - error (Exception): The failure that lost the rest of the data.
+    - data (pandas.DataFrame or None): The data that was read.
+    - follow (list of tuple): The (url, kind) pairs of pages to crawl next.
+    """
+
+    def __init__(self, error, data, follow):
+        super().__init__(error, data, follow)
+        self.error = error
+        self.data = data
+        self.follow = follow
+
+def handle_league(url, html):
+    page = lf.LeaguePage(url, html)
+    teams = [link for link in page.link_table()['Zespół'].iloc[1:] if link]
+    data = lf.table_frame(page).assign(url=url)
+    return data, [(team, 'team') for team in teams]
+
+def handle_team(url, html):
+    # The matches page is followed even when the squad cannot be read; only the squad data is lost then
+    matches = [href for href in lf.parse_links(html) if 'mecze' in href]
+    follow = [(urljoin(url, matches[0]), 'matches')] if matches else []
+    try:
+        data = lf.squad_frame(html).assign(team_url=url)
+    except lf.PageError as error:
+        raise PartialPage(error, None, follow) from error
+    return data, follow
+
+def handle_matches(url, html):
+    data = lf.results_frame(html).assign(url=url)
+    reports = [href for href in lf.parse_links(html) if 'raport' in href and 'veo' not in href]
+    return data, [(_absolute(href), 'report') for href in reports]
+
+def handle_report(url, html):
+    report = lf.parse_report(html)
+    data = lf.report_players(report).assign(match_id=lf.report_id(url), link=url)
+    return data, []
+
+HANDLERS = {
+    'league': handle_league,
+    'team': handle_team,
+    'matches': handle_matches,
+    'report': handle_report,
+}
+
+class Crawler:
+    """
+    Crawls ligafanow.pl pages with asyncio, starting from the added seeds and following the links the handlers
+    return.
+
+    Parameters:
+    - handlers (dict or None): Page kind -> handler. Defaults to HANDLERS.
+    - concurrency (int or None): The total number of pages downloaded at once. Defaults to HTTP_CONFIG['max_workers'].
+    - per_host (int): The number of pages downloaded at once from a single host.
+    - rate_limit (float or None): Requests per second per host, None to rely on HTTP_CONFIG['rate_limit'] only.
+    - checkpoint (str or None): A directory in which progress is saved; an existing checkpoint is resumed.
+    - checkpoint_every (int): Progress is saved after this many pages.
+    - processes (int or None): If provided, the handlers run in this many worker processes instead of threads, so
+      parsing uses several cores. Handlers must then be module-level functions.
+    - retries (int or None): Transient failures (see utils.is_retryable()) are queued again up to this many times,
+      after an exponential backoff. Defaults to HTTP_CONFIG['page_retries'].
+    """
+
+    def __init__(self, handlers=None, concurrency=None, per_host=4, rate_limit=None, checkpoint=None,
+                 checkpoint_every=25, processes=None, retries=None):
+        self.handlers = handlers or HANDLERS
+        self.concurrency = concurrency or lf.HTTP_CONFIG['max_workers']
+        self.per_host = per_host
+        self.rate_limit = rate_limit
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.processes = processes
+        self.retries = lf.HTTP_CONFIG['page_retries'] if retries is None else retries
+
+        self.seen = set()
+        self.done = set()
+        self.queue = []  # heap of (priority, sequence, url, kind)
+        self.in_flight = {}  # url -> (priority, kind) of pages being downloaded or parsed
+        self.errors = []  # envelopes of the pages that failed for good (see utils.page_result())
+        self.attempts = {}  # url -> failed attempts of pages queued again after a transient failure
+        self.results = {kind: [] for kind in self.handlers}
+        self._sequence = 0
+        self._since_checkpoint = 0
+        self._host_slots = {}
+        self._host_next = {}
+        self._pool = None
+
+        if checkpoint is not None and os.path.exists(os.path.join(checkpoint, 'state.json')):
+            self._load_checkpoint()
+
+    # QUEUE
+
+    def add(self, url, kind, priority=None):
+        """
+        Schedules a page unless it has already been seen in this run.
+
+        Returns:
+        - bool: True if the page was added to the queue.
+        """
+        url = normalize_url(url)
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        priority = PRIORITIES.get(kind, len(PRIORITIES)) if priority is None else priority
+        heapq.heappush(self.queue, (priority, self._sequence, url, kind))
+        self._sequence += 1
+        return True
+
+    # RUNNING
+
+    def run(self):
+        """
+        Runs the crawl until the queue is empty (see run_async()).
+        """
+        return asyncio.run(self.run_async())
+
+    async def run_async(self):
+        """
+        Crawls all queued pages and every page discovered from them.
+
+        Returns:
+        - dict: Page kind -> DataFrame of everything parsed from pages of that kind (see frames()).
+        """
+        wakeup = asyncio.Event()
+        active = 0
+
+        async def worker():
+            nonlocal active
+            while True:
+                while not self.queue:
+                    if active == 0:
+                        wakeup.set()
+                        return
+                    wakeup.clear()
+                    await wakeup.wait()
+                priority, _, url, kind = heapq.heappop(self.queue)
+                self.in_flight[url] = (priority, kind)
+                active += 1
+                try:
+                    await self._process(url, kind)
+                finally:
+                    self.in_flight.pop(url, None)
+                    active -= 1
+                    wakeup.set()
+
+        if self.processes:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=lf.process_context())
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        self.save_checkpoint()
+        return self.frames()
+
+    async def _process(self, url, kind):
+        host = urlsplit(url).netloc
+        slots = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with slots:
+            await self._wait_for_host(host)
+            complete = True
+            try:
+                response = await asyncio.to_thread(lf.fetch, url)
+                if self._pool is None:
+                    data, follow = await asyncio.to_thread(self.handlers[kind], url, response.text)
+                else:
+                    encoding = response.encoding or response.apparent_encoding
+                    data, follow = await asyncio.get_running_loop().run_in_executor(
+                        self._pool, _handle_in_worker, self.handlers[kind], url, response.content, encoding,
+                        lf.parser_backend())
+            except PartialPage as partial:
+                data, follow, complete = partial.data, partial.follow, False
+                self._record_error(url, kind, partial.error, 1)
+            except Exception as error:  # a broken page must not stop the crawl
+                await self._failed(url, kind, error)
+                return
+
+        if data is not None:
+            self.results[kind].append(data)
+            self._append_result(url, kind, data)
+        for next_url, next_kind in follow:
+            if next_kind in self.handlers:
+                self.add(next_url, next_kind)
+        if complete:
+            # Częściowo odczytana strona nie jest oznaczana jako zrobiona, więc wznowienie może ją pobrać ponownie
+            self.done.add(url)
+
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.checkpoint_every:
+            self.save_checkpoint()
+
+    async def _failed(self, url, kind, error):
+        attempts = self.attempts.get(url, 0) + 1
+        if lf.is_retryable(error) and attempts <= self.retries:
+            # Strona wraca do kolejki po odczekaniu; inne strony są w tym czasie pobierane dalej
+            self.attempts[url] = attempts
+            await asyncio.sleep(lf.HTTP_CONFIG['backoff_factor'] * 2 ** (attempts - 1))
+            heapq.heappush(self.queue, (PRIORITIES.get(kind, len(PRIORITIES)), self._sequence, url, kind))
+            self._sequence += 1
+            return
+        self.attempts.pop(url, None)
+        self._record_error(url, kind, error, attempts)
+
+    def _record_error(self, url, kind, error, attempts):
+        self.errors.append({'url': url, 'kind': kind, 'status': 'retryable' if lf.is_retryable(error) else 'error',
+                            'error': repr(error), 'attempts': attempts})
+
+    async def _wait_for_host(self, host):
+        if not self.rate_limit:
+            return
+        now = time.monotonic()
+        slot = max(now, self._host_next.get(host, now))
+        self._host_next[host] = slot + 1.0 / self.rate_limit
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    # RESULTS
+
+    def frames(self):
+        """
+        Returns everything parsed so far.
+
+        Returns:
+        - dict: Page kind -> concatenated DataFrame (empty when no page of that kind was parsed).
+        """
+        return {kind: pd.concat(data, ignore_index=True) if data else pd.DataFrame()
+                for kind, data in self.results.items()}
+
+    def error_report(self):
+        """
+        Returns the pages that failed for good as a table (see utils.error_report()), with their kind.
+        """
+        return lf.error_report(self.errors).assign(kind=[error['kind'] for error in self.errors])
+
+    # CHECKPOINTS
+
+    def save_checkpoint(self):
+        """
+        Saves the queue and the visited pages to the checkpoint directory. Parsed data is appended to it as the
+        crawl goes, so it is not written again here.
+        """
+        self._since_checkpoint = 0
+        if self.checkpoint is None:
+            return
+        os.makedirs(self.checkpoint, exist_ok=True)
+        state = {
+            'done': sorted(self.done),
+            # pages in flight are saved as queued, so an interruption does not lose them
+            'queue': [[priority, url, kind] for priority, _, url, kind in sorted(self.queue)]
+                     + [[priority, url, kind] for url, (priority, kind) in self.in_flight.items()],
+            'errors': self.errors,
+        }
+        file = os.path.join(self.checkpoint, 'state.json')
+        with open(file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(file + '.tmp', file)
+
+    def _append_result(self, url, kind, data):
+        # One line per page; columns are stored separately because some tables repeat a column name
+        if self.checkpoint is None:
+            return
+        os.makedirs(self.checkpoint, exist_ok=True)
+        line = {'url': url, 'columns': list(data.columns), 'data': data.astype(object).where(data.notna(), None).values.tolist()}
+        with open(os.path.join(self.checkpoint, f'{kind}.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(line, ensure_ascii=False, default=str) + '\n')
+
+    def _load_checkpoint(self):
+        with open(os.path.join(self.checkpoint, 'state.json'), encoding='utf-8') as f:
+            state = json.load(f)
+        self.done = set(state['done'])
+        self.seen = set(self.done)
+        self.errors = state.get('errors', [])
+        for priority, url, kind in state['queue']:
+            self.add(url, kind, priority)
+        # Pages that failed for a transient reason are tried again; pages that could not be parsed stay failed
+        for error in self.errors:
+            if error.get('status', 'retryable') == 'retryable':
+                self.add(error['url'], error['kind'])
+        self.errors = [error for error in self.errors if error.get('status', 'retryable') != 'retryable']
+        for kind in self.handlers:
+            file = os.path.join(self.checkpoint, f'{kind}.jsonl')
+            if os.path.exists(file):
+                # Only pages recorded as done count; a page parsed just before an interruption is crawled again
+                pages = {}
+                with open(file, encoding='utf-8') as f:
+                    for line in f:
+                        page = json.loads(line)
+                        if page['url'] in self.done:
+                            pages[page['url']] = pd.DataFrame(page['data'], columns=page['columns'])
+                self.results[kind].extend(pages.values())
+
+# MAIN FUNCTIONS
+
+def crawl(leagues=None, ligi=lf.ligi, checkpoint=None, season=None, **options):
+    """
+    Crawls whole leagues: the league tables, every team page (squads), every matches page and every match report.
+
+    Parameters:
+    - leagues (list of str or None): The leagues to crawl. Defaults to all leagues in ligi.
+    - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+    - checkpoint (str or None): A directory for progress; an interrupted crawl with the same directory resumes.
+    - season (int, str or None): If provided, the leagues of this season are crawled (see utils.season_leagues()).
+    - **options: Further arguments of Crawler (concurrency, per_host, rate_limit, ...).
+
+    Returns:
+    - dict: 'league', 'team', 'matches' and 'report' -> DataFrame of the parsed pages.
+    """
+    ligi = lf.season_leagues(season, ligi)
+    crawler = Crawler(checkpoint=checkpoint, **options)
+    for league in leagues or list(ligi):
+        crawler.add(ligi[league], 'league')
+    return crawler.run()
+
+# ASIDE FUNCTIONS
+
+def normalize_url(url):
+    """
+    Returns url without its fragment and trailing slash, so the same page reached by different links is crawled
+    once.
+    """
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path.rstrip('/') or '/', parts.query, ''))
+
+def _absolute(href):
+    # Report links on the matches page are relative to the site root (see utils.reports_links())
+    return href if urlsplit(href).scheme else BASE_URL + href.lstrip('/')
+
+def _handle_in_worker(handler, url, content, encoding, backend):
+    # Runs a handler in a worker process on the raw page bytes (see utils.parse_pages())
+    lf.PARSER_CONFIG['backend'] = backend
+    return handler(url, str(content, encoding or 'utf-8', errors='replace'))
@@ -0,0 +1,272 @@
+# LIBRARIES NEEDED
+
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+
+import utils as lf
+
+# Local SQLite store of leagues, teams, matches, squads and match report events, filled by the scrapers in utils
+# and queried without touching the network.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leagues (
+    league TEXT, season TEXT, url TEXT,
+    PRIMARY KEY (league, season)
+);
+CREATE TABLE IF NOT EXISTS teams (
+    league TEXT, season TEXT, team TEXT, url TEXT, position INTEGER, played INTEGER, points INTEGER,
+    goals_for INTEGER, goals_against INTEGER, form TEXT,
+    PRIMARY KEY (league, season, team)
+);
+CREATE TABLE IF NOT EXISTS matches (
+    league TEXT, season TEXT, round INTEGER, date TEXT, time TEXT, home TEXT, away TEXT, score TEXT,
+    home_goals INTEGER, away_goals INTEGER,
+    PRIMARY KEY (league, season, round, home, away)
+);
+CREATE TABLE IF NOT EXISTS players (
+    league TEXT, season TEXT, team TEXT, player TEXT, number TEXT, appearances INTEGER, goals INTEGER,
+    assists INTEGER, mvp INTEGER, red_cards INTEGER, yellow_cards INTEGER, clean_sheets INTEGER, player_id TEXT,
+    PRIMARY KEY (league, season, team, player)
+);
+CREATE TABLE IF NOT EXISTS report_events (
+    match_id TEXT, league TEXT, season TEXT, round INTEGER, team TEXT, player TEXT, stat TEXT, value INTEGER,
+    PRIMARY KEY (match_id, team, player, stat)
+);
+CREATE INDEX IF NOT EXISTS matches_home ON matches (home);
+CREATE INDEX IF NOT EXISTS matches_away ON matches (away);
+CREATE INDEX IF NOT EXISTS matches_round ON matches (league, season, round);
+CREATE INDEX IF NOT EXISTS matches_date ON matches (date);
+CREATE INDEX IF NOT EXISTS players_player ON players (player);
+CREATE INDEX IF NOT EXISTS players_team ON players (team);
+CREATE INDEX IF NOT EXISTS report_events_player ON report_events (player);
+CREATE INDEX IF NOT EXISTS report_events_team ON report_events (team);
+CREATE INDEX IF NOT EXISTS report_events_round ON report_events (league, season, round);
+"""
+
+# Columns of extract_team() stored in the players table
+SQUAD_COLUMNS = {
+    'Imie i nazwisko': 'player',
+    'Numer': 'number',
+    'Liczba wystepów': 'appearances',
+    'Liczba bramek': 'goals',
+    'Asysty': 'assists',
+    'MVP': 'mvp',
+    'Czerwone kartki': 'red_cards',
+    'Zółte kartki': 'yellow_cards',
+    'Czyste konto': 'clean_sheets',
+    'ID': 'player_id',
+}
+
+# Columns of the long-format players table of a match report (one row per player and event, e.g. 'Bramka' 2)
+REPORT_COLUMNS = {
+    'Imie i nazwisko': 'player',
+    'Wydarzenie': 'stat',
+    'Ilość': 'value',
+}
+
+class LeagueDB:
+    """
+    Embedded SQLite database of scraped league data with indexes on team, round, date and player.
+
+    Parameters:
+    - path (str): The database file. It is created if it does not exist; ':memory:' keeps it in memory.
+    """
+
+    def __init__(self, path='ligafanow.db'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    # FILLING
+
+    def ingest_league(self, league, ligi=lf.ligi, squads=True, reports=True, workers=None, season=None,
+                      errors=None):
+        """
+        Scrapes a league with the functions from utils and stores everything in the database.
+
+        Parameters:
+        - league (str): The name of the league.
+        - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+        - squads (bool): If True, the squads of all teams are scraped as well.
+        - reports (bool): If True, the match reports not yet stored are scraped as well.
+        - workers (int or None): The maximum number of pages downloaded at once.
+        - season (int, str or None): If provided, the league of this season is stored (see utils.season_leagues()).
+        - errors (list or None): If provided, pages that fail are skipped and their envelopes (see
+          utils.page_result()) are appended to it; reports not stored are tried again on the next call. By default
+          the first failure is raised.
+
+        Returns:
+        - dict: The number of teams, matches, players and new reports stored.
+        """
+        ligi = lf.season_leagues(season, ligi)
+        season = league_season(ligi[league])
+        with lf.league_scope():
+            table = lf.get_table(league, ligi)
+            links = lf.table_of_links(league, ligi)
+            self.ingest_table(league, table, links, ligi=ligi)
+            matches = lf.get_matches(league, ligi=ligi, workers=workers, errors=errors)
+            self.ingest_matches(league, matches, ligi=ligi)
+
+            counts = {'teams': len(table), 'matches': len(matches), 'players': 0, 'reports': 0}
+            if squads:
+                teams = {_team_url(links, team): team for team in table['Zespół'] if _team_url(links, team)}
+                for url, squad in lf.map_pages(lf.extract_team, teams, workers, errors):
+                    team = teams[url]
+                    self.ingest_squad(league, team, squad, ligi=ligi)
+                    counts['players'] += len(squad)
+            if reports:
+                known = set(self.query('SELECT DISTINCT match_id FROM report_events WHERE league = ? AND season = ?',
+                                       (league, season))['match_id'])
+                team_links = [team for _, team in lf.map_pages(lf.reports_links, links['Zespół'], workers, errors)]
+                new_links = [link for link in dict.fromkeys(link for team in team_links for link in team)
+                             if lf.report_id(link) not in known]
+                for record in lf.iter_match_reports(new_links, workers, errors):
+                    self.ingest_report(league, record, ligi=ligi)
+                    counts['reports'] += 1
+        return counts
+
+    def ingest_table(self, league, table, links=None, ligi=lf.ligi):
+        """
+        Stores the output of get_table() (and optionally the team links from table_of_links()) in the teams table.
+        """
+        season = league_season(ligi[league])
+        rows = []
+        for _, row in table.iterrows():
+            values = row.tolist()  # the table has two columns named 'Pkt.'
+            url = _team_url(links, row['Zespół']) if links is not None else None
+            rows.append((league, season, row['Zespół'], url, int(row['Poz']), int(row['Mecze_rozegrane']),
+                         int(values[3]), int(row['BZ']), int(row['BS']), row['Forma']))
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO leagues VALUES (?, ?, ?)', (league, season, ligi[league]))
+            self._conn.executemany('INSERT OR REPLACE INTO teams VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def ingest_matches(self, league, matches, ligi=lf.ligi):
+        """
+        Stores the output of get_matches() in the matches table.
+        """
+        season = league_season(ligi[league])
+        # The score column has no header on the site (see utils.score_column())
+        position = lf.score_column(matches)
+        scores = matches.iloc[:, position] if position is not None else [None] * len(matches)
+        rows = []
+        for (_, row), score in zip(matches.iterrows(), scores):
+            home_goals, away_goals = lf.split_score(score)
+            rows.append((league, season, _int_or_none(row['Kol.']), row['Data'], row['Godz.'], row['Gospodarz'],
+                         row['Gość'], score, home_goals, away_goals))
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def ingest_squad(self, league, team, squad, ligi=lf.ligi):
+        """
+        Stores the output of extract_team() for one team in the players table.
+        """
+        season = league_season(ligi[league])
+        squad = squad.loc[:, ~squad.columns.duplicated()].rename(columns=SQUAD_COLUMNS)
+        rows = [(league, season, team, row['player'], row['number'], _int_or_none(row['appearances']),
+                 _int_or_none(row['goals']), _int_or_none(row['assists']), _int_or_none(row['mvp']),
+                 _int_or_none(row['red_cards']), _int_or_none(row['yellow_cards']),
+                 _int_or_none(row['clean_sheets']), row['player_id'])
+                for _, row in squad.iterrows()]
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def ingest_report(self, league, record, ligi=lf.ligi):
+        """
+        Stores a report_record() in the report_events table, one row per player and event ('Bramka', 'Asysta',
+        'Żółta kartka', ...) with its count.
+        """
+        season = league_season(ligi[league])
+        events = record['players'].rename(columns=REPORT_COLUMNS)
+        # Zdarzenie wpisane w kilku wierszach jest sumowane, kluczem jest (mecz, drużyna, zawodnik, zdarzenie)
+        counts = pd.to_numeric(events['value'], errors='coerce')
+        counts = counts.groupby([events['Zespół'], events['player'], events['stat']], sort=False).sum(min_count=1)
+        rows = [(record['match_id'], league, season, _int_or_none(record['kolejka']), team, player, stat,
+                 _int_or_none(value))
+                for (team, player, stat), value in counts.items()]
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO report_events VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    # QUERIES
+
+    def query(self, sql, params=()):
+        """
+        Runs any SQL query against the database.
+
+        Returns:
+        - pandas.DataFrame: The result set.
+        """
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def team_matches(self, team, league=None, season=None):
+        """
+        Returns all stored matches of a team (as home or away side), the most recent round first.
+        """
+        sql = 'SELECT * FROM matches WHERE (home = ? OR away = ?)'
+        sql, params = _filters(sql, [team, team], league=league, season=season)
+        return self.query(sql + ' ORDER BY season DESC, round DESC, time', params)
+
+    def round_results(self, league, round_, season=None):
+        """
+        Returns the stored matches of one round of a league.
+        """
+        sql, params = _filters('SELECT * FROM matches WHERE round = ?', [round_], league=league, season=season)
+        return self.query(sql + ' ORDER BY time', params)
+
+    def player_stats(self, player, league=None):
+        """
+        Returns the squad statistics of a player in every stored league and season.
+        """
+        sql, params = _filters('SELECT * FROM players WHERE player = ?', [player], league=league)
+        return self.query(sql + ' ORDER BY season, league', params)
+
+    def player_goals(self, player):
+        """
+        Returns the goals of a player per season and league, taken from the squad tables.
+        """
+        return self.query('SELECT season, league, team, SUM(goals) AS goals FROM players WHERE player = ? '
+                          'GROUP BY season, league, team ORDER BY season, league', (player,))
+
+    def player_events(self, player, stat=None):
+        """
+        Returns the match report rows of a player, optionally limited to one statistic.
+        """
+        sql, params = _filters('SELECT * FROM report_events WHERE player = ?', [player], stat=stat)
+        return self.query(sql + ' ORDER BY season, round', params)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# ASIDE FUNCTIONS
+
+def league_season(url):
+    """
+    Reads the season number from a league URL such as 'https://ligafanow.pl/rozgrywki/tabela/30/235'.
+
+    Returns:
+    - str or None: The season, e.g. '30'.
+    """
+    match = re.search(r'/(?:tabela|strzelcy)/(\d+)/', url)
+    return match[1] if match else None
+
+def _team_url(links, team):
+    urls = links.loc[links['Zespół'].str.contains(lf.adjust_team_name(team), regex=False), 'Zespół']
+    return urls.iloc[0] if len(urls) else None
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _filters(sql, params, **conditions):
+    for column, value in conditions.items():
+        if value is not None:
+            sql += f' AND {column} = ?'
+            params.append(value)
+    return sql, params
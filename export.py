@@ -0,0 +1,198 @@
+# LIBRARIES NEEDED
+
+import hashlib
+import json
+import os
+import re
+import time
+
+import pandas as pd
+
+import utils as lf
+
+# Bulk export of whole seasons to partitioned Parquet files.
+#
+# Layout of the output directory:
+#   tables/league=<league>/part-0.parquet             current league table
+#   squads/league=<league>/part-0.parquet             squads of all teams
+#   matches/league=<league>/round=<n>/part-0.parquet  fixtures and results of a round
+#   reports/league=<league>/round=<n>/<match_id>.parquet  players table of one match report
+#   _state.json                                        what has been written so far
+
+STATE_FILE = '_state.json'
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# MAIN FUNCTIONS
+
+def export_season(path='ligafanow_data', leagues=None, ligi=lf.ligi, full=False, workers=None, season=None,
+                  errors=None):
+    """
+    Crawls the given leagues (tables, fixtures, squads and every match report) and writes them to partitioned
+    Parquet files. Later runs download matches pages only of the teams whose row in the league table changed,
+    only write rounds whose fixtures changed and fetch only reports that are new since the last snapshot.
+
+    Parameters:
+    - path (str): The output directory. It is created if it does not exist.
+    - leagues (list of str or None): The leagues to export. Defaults to all leagues in ligi.
+    - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+    - full (bool): If True, the previous snapshot is ignored and everything is fetched and written again.
+    - workers (int or None): The maximum number of pages downloaded at once. Defaults to HTTP_CONFIG['max_workers'].
+    - season (int, str or None): If provided, the leagues of this season are exported (see
+      utils.season_leagues()). Partitions are per league, so every season needs its own path.
+    - errors (list or None): If provided, pages that fail are skipped and their envelopes (see utils.page_result())
+      are appended to it. Failed teams and reports are not recorded in the state, so the next run tries them
+      again. By default the first failure is raised.
+
+    Returns:
+    - pandas.DataFrame: One row per league with the number of teams, teams whose matches were downloaded again,
+      rounds written, new reports and failed pages.
+    """
+    _require_parquet()
+    ligi = lf.season_leagues(season, ligi)
+    os.makedirs(path, exist_ok=True)
+    state = {} if full else read_state(path)
+    summary = []
+
+    for league in leagues or list(ligi):
+        with lf.league_scope():
+            summary.append(export_league(path, league, state, ligi=ligi, workers=workers, errors=errors))
+        state['updated'] = time.time()
+        _write_state(path, state)
+
+    return pd.DataFrame(summary, columns=['league', 'teams', 'teams_refreshed', 'rounds_written', 'new_reports',
+                                          'errors'])
+
+def export_league(path, league, state, ligi=lf.ligi, workers=None, errors=None):
+    """
+    Exports a single league into path and updates state in place. Used by export_season().
+
+    Returns:
+    - dict: The number of teams, teams refreshed, rounds written, new reports and failed pages of the league.
+    """
+    failed = None if errors is None else []  # failures of this league, counted in the summary
+    league_state = state.setdefault('leagues', {}).setdefault(league, {'rounds': {}, 'reports': []})
+    teams = list(lf.table_of_links(league, ligi)['Zespół'])
+
+    # Table and squads always describe the current state, so they are simply overwritten
+    _write(typed_frame(lf.get_table(league, ligi)), path, 'tables', league)
+    squads = [squad for _, squad in lf.map_pages(_team_squad, teams, workers, failed)]
+    if squads:
+        _write(typed_frame(pd.concat(squads, ignore_index=True)), path, 'squads', league)
+
+    # Fixtures: download only the teams that played since the last run, rewrite only the rounds whose rows changed
+    matches = lf.refresh_matches(league, league_state.setdefault('fixtures', {}), ligi=ligi, workers=workers,
+                                 errors=failed)
+    rounds_written = 0
+    for round_, rows in matches.groupby('Kol.', sort=True):
+        rows = typed_frame(rows.drop(columns='Kol.').reset_index(drop=True))
+        digest = _digest(rows)
+        if league_state['rounds'].get(str(round_)) != digest:
+            _write(rows, path, 'matches', league, round_)
+            league_state['rounds'][str(round_)] = digest
+            rounds_written += 1
+
+    # Reports: fetch only the ones not exported before; the links were read with the fixtures
+    links = [team['reports'] for team in league_state['fixtures']['teams'].values()]
+    known = set(league_state['reports'])
+    new_links = [link for link in dict.fromkeys(link for team_links in links for link in team_links)
+                 if lf.report_id(link) not in known]
+    new_reports = 0
+    for record in lf.iter_match_reports(new_links, workers, failed):
+        _write(typed_frame(lf.report_frame(record).drop(columns='kolejka')),
+               path, 'reports', league, record['kolejka'], name=f"{record['match_id']}.parquet")
+        league_state['reports'].append(record['match_id'])
+        new_reports += 1
+
+    if failed:
+        errors.extend(failed)
+    return {'league': league, 'teams': len(teams), 'teams_refreshed': len(league_state['fixtures']['changed']),
+            'rounds_written': rounds_written, 'new_reports': new_reports, 'errors': len(failed or ())}
+
+def read_export(path='ligafanow_data', kind='matches', league=None):
+    """
+    Reads back an exported dataset, with the partition keys ('league', 'round') restored as columns.
+
+    Parameters:
+    - path (str): The directory written by export_season().
+    - kind (str): 'tables', 'squads', 'matches' or 'reports'.
+    - league (str or None): If provided, only this league is read.
+
+    Returns:
+    - pandas.DataFrame: The concatenated dataset.
+    """
+    _require_parquet()
+    filters = [('league', '==', league)] if league is not None else None
+    return pd.read_parquet(os.path.join(path, kind), filters=filters)
+
+def read_state(path='ligafanow_data'):
+    """
+    Returns the snapshot state stored in path, or an empty state when nothing has been exported yet.
+    """
+    file = os.path.join(path, STATE_FILE)
+    if not os.path.exists(file):
+        return {}
+    with open(file, encoding='utf-8') as f:
+        return json.load(f)
+
+# ASIDE FUNCTIONS
+
+def typed_frame(df):
+    """
+    Prepares a scraped DataFrame for Parquet: duplicated column names get a numeric suffix, columns holding only
+    whole numbers become nullable integers, columns holding only dates become datetimes and the remaining ones
+    strings.
+
+    Parameters:
+    - df (pandas.DataFrame): A DataFrame returned by one of the scrapers.
+
+    Returns:
+    - pandas.DataFrame: A copy with unique column names and explicit dtypes.
+    """
+    df = df.copy()
+    seen = {}
+    columns = []
+    for column in df.columns:
+        seen[column] = seen.get(column, 0) + 1
+        columns.append(column if seen[column] == 1 else f'{column}_{seen[column]}')
+    df.columns = columns
+
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_integer_dtype(values):
+            df[column] = values.astype('Int64')
+            continue
+        numbers = pd.to_numeric(values, errors='coerce')
+        if values.notna().any() and numbers.notna().eq(values.notna()).all() and (numbers.dropna() % 1 == 0).all():
+            df[column] = numbers.astype('Int64')
+        elif values.notna().any() and values.dropna().astype(str).str.fullmatch(DATE_PATTERN).all():
+            df[column] = pd.to_datetime(values, format='%Y-%m-%d')
+        else:
+            df[column] = values.astype('string')
+    return df
+
+def _team_squad(url):
+    squad = lf.extract_team(url)
+    squad['team_url'] = url
+    return squad
+
+def _write(df, path, kind, league, round_=None, name='part-0.parquet'):
+    directory = os.path.join(path, kind, f'league={league}')
+    if round_ is not None:
+        directory = os.path.join(directory, f'round={round_}')
+    os.makedirs(directory, exist_ok=True)
+    df.to_parquet(os.path.join(directory, name), index=False)
+
+def _write_state(path, state):
+    file = os.path.join(path, STATE_FILE)
+    with open(file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(file + '.tmp', file)
+
+def _digest(df):
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+
+def _require_parquet():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError('Parquet export needs pyarrow, install it with: pip install pyarrow') from None
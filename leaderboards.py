@@ -0,0 +1,245 @@
+# LIBRARIES NEEDED
+
+import pandas as pd
+
+import utils as lf
+
+# Season leaderboards of players and teams aggregated from match reports, next to the official scorers tables of
+# the 'strzelcy' pages. Totals are kept as running sums, so new reports are added with one groupby over the new
+# rows instead of recomputing the season.
+
+# Statistic name -> events ('Wydarzenie' column of a report players table) counted in it
+STATS = {
+    'goals': ['Bramka'],
+    'assists': ['Asysta'],
+    'superstar': ['SuperStar'],
+    'mvp': ['MVP'],
+    'top6': ['6 - kolejki'],
+    'yellow_cards': ['Żółta kartka', 'Zółta kartka'],
+    'red_cards': ['Czerwona kartka'],
+    'goals_conceded': ['Bramka stracona'],
+    'clean_sheets': ['Czyste konto'],
+}
+
+# Event -> statistic
+EVENTS = {event: stat for stat, events in STATS.items() for event in events}
+
+# Column -> names under which it may appear on a scorers page (see utils.get_scorers())
+SCORER_COLUMNS = {
+    'player': ['Imie i nazwisko', 'Imię i nazwisko', 'Zawodnik'],
+    'team': ['Zespół', 'Drużyna'],
+    'goals': ['Bramki', 'Liczba bramek', 'Gole'],
+}
+
+TEAM_STATS = ['matches', 'wins', 'draws', 'losses', 'goals_for', 'goals_against', 'clean_sheets', 'points']
+
+class Leaderboards:
+    """
+    Running player and team totals over match reports, per league and across all leagues. Leagues are identified
+    by name only, so use one Leaderboards per season.
+    """
+
+    def __init__(self):
+        self.players = pd.DataFrame(columns=['matches'] + list(STATS), dtype='int64',
+                                    index=pd.MultiIndex.from_tuples([], names=['league', 'player', 'team']))
+        self.teams = pd.DataFrame(columns=TEAM_STATS, dtype='int64',
+                                  index=pd.MultiIndex.from_tuples([], names=['league', 'team']))
+        self.match_ids = set()
+        self.official = pd.DataFrame(columns=['goals'], dtype='int64',
+                                     index=pd.MultiIndex.from_tuples([], names=['league', 'player', 'team']))
+
+    # UPDATING
+
+    def add_reports(self, records, league):
+        """
+        Adds report records (see utils.report_record()) of a league to the totals. Reports already counted are
+        skipped, so the same report reached from both teams is counted once.
+
+        Parameters:
+        - records (iterable of dict): The report records.
+        - league (str): The league the reports belong to.
+
+        Returns:
+        - int: The number of reports added.
+        """
+        new = []
+        for record in records:
+            if record['match_id'] not in self.match_ids:
+                self.match_ids.add(record['match_id'])
+                new.append(record)
+        if not new:
+            return 0
+
+        player_rows = pd.concat([player_stats(record) for record in new], ignore_index=True)
+        player_rows['league'] = league
+        player_totals = player_rows.groupby(['league', 'player', 'team']).sum()
+        self.players = self.players.add(player_totals, fill_value=0).astype('int64')
+
+        team_rows = team_stats(new)
+        team_rows['league'] = league
+        team_totals = team_rows.groupby(['league', 'team']).sum()
+        self.teams = self.teams.add(team_totals, fill_value=0).astype('int64')
+        return len(new)
+
+    def ingest_league(self, league, ligi=lf.ligi, workers=None, chunk=50, errors=None, season=None):
+        """
+        Streams the reports of a league that are not counted yet and adds them in chunks.
+
+        Parameters:
+        - league (str): The name of the league.
+        - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+        - workers (int or None): The maximum number of pages downloaded at once.
+        - chunk (int): The number of reports added to the totals at a time.
+        - errors (list or None): If provided, pages that fail are skipped and their envelopes (see
+          utils.page_result()) are appended to it; skipped reports are picked up by the next call. By default the
+          first failure is raised.
+        - season (int, str or None): If provided, the league of this season is used (see utils.season_leagues()).
+
+        Returns:
+        - int: The number of reports added.
+        """
+        added = 0
+        batch = []
+        for record in lf.iter_league_reports(league, workers, ligi, exclude=self.match_ids, season=season,
+                                             errors=errors):
+            batch.append(record)
+            if len(batch) >= chunk:
+                added += self.add_reports(batch, league)
+                batch = []
+        added += self.add_reports(batch, league)
+        return added
+
+    def ingest_scorers(self, league, ligi_strzelcy=lf.ligi_strzelcy, season=None):
+        """
+        Downloads the scorers page of a league (see utils.get_scorers()) and keeps its goals as the official
+        totals of the league, replacing the ones read before.
+
+        Returns:
+        - int: The number of players on the page.
+        """
+        scorers = scorer_goals(lf.get_scorers(league, ligi_strzelcy, season=season))
+        scorers['league'] = league
+        scorers = scorers.groupby(['league', 'player', 'team']).sum()
+        others = self.official[self.official.index.get_level_values('league') != league]
+        self.official = pd.concat([others, scorers]).astype('int64')
+        return len(scorers)
+
+    # QUERIES
+
+    def leaderboard(self, stat='goals', league=None, n=10):
+        """
+        Returns the best players in a statistic.
+
+        Parameters:
+        - stat (str): One of the keys of STATS, or 'matches'.
+        - league (str or None): If provided, only this league is ranked; otherwise totals across all leagues are.
+        - n (int or None): The number of players returned, None for all.
+
+        Returns:
+        - pandas.DataFrame: Columns 'player', 'team' (and 'league' for a single league), the statistic and
+          'matches', sorted from the best.
+        """
+        if league is not None:
+            df = self.players.xs(league, level='league', drop_level=False)
+        else:
+            df = self.players.groupby(level=['player', 'team']).sum()
+        df = df[[stat] + (['matches'] if stat != 'matches' else [])]
+        df = df.sort_values([stat, 'matches'], ascending=[False, True]).reset_index()
+        return df.head(n) if n is not None else df
+
+    def scorers(self, league=None, n=10):
+        """
+        Returns the best scorers by the official goals of the scorers pages (see ingest_scorers()), with the goals
+        counted from the ingested reports next to them, so missing reports show up as a difference.
+
+        Returns:
+        - pandas.DataFrame: Columns 'player', 'team' (and 'league' for a single league), 'goals' and
+          'report_goals', sorted from the best.
+        """
+        official = self.official
+        counted = self.players[['goals']]
+        if league is not None:
+            official = official[official.index.get_level_values('league') == league]
+            counted = counted[counted.index.get_level_values('league') == league]
+        else:
+            official = official.groupby(level=['player', 'team']).sum()
+            counted = counted.groupby(level=['player', 'team']).sum()
+        df = official.join(counted.rename(columns={'goals': 'report_goals'}), how='left')
+        df['report_goals'] = df['report_goals'].fillna(0).astype('int64')
+        df = df.sort_values(['goals', 'report_goals'], ascending=False).reset_index()
+        return df.head(n) if n is not None else df
+
+    def team_table(self, league=None):
+        """
+        Returns team totals (matches, results, goals, clean sheets and points) sorted by points.
+        """
+        if league is not None:
+            df = self.teams.xs(league, level='league', drop_level=False)
+        else:
+            df = self.teams.groupby(level='team').sum()
+        df = df.assign(goal_difference=df['goals_for'] - df['goals_against'])
+        return df.sort_values(['points', 'goal_difference', 'goals_for'], ascending=False).reset_index()
+
+# ASIDE FUNCTIONS
+
+def player_stats(record):
+    """
+    Pivots the long-format players table of one report (one row per player and event, with the count in 'Ilość')
+    into the statistics listed in STATS.
+
+    Returns:
+    - pandas.DataFrame: One row per player listed in the report with 'player', 'team', 'matches' (always 1) and
+      one column per statistic (0 when the player has no such event).
+    """
+    players = record['players']
+    events = pd.DataFrame({'player': players['Imie i nazwisko'].astype(str).to_numpy(),
+                           'team': players['Zespół'].to_numpy(),
+                           'stat': players['Wydarzenie'].map(EVENTS).to_numpy(),
+                           'count': pd.to_numeric(players['Ilość'], errors='coerce').fillna(0).to_numpy()})
+    df = events.dropna(subset=['stat']).pivot_table(index=['player', 'team'], columns='stat', values='count',
+                                                    aggfunc='sum')
+    # Zawodnicy z samymi nieznanymi zdarzeniami też zagrali w meczu
+    players = pd.MultiIndex.from_frame(events[['player', 'team']].drop_duplicates())
+    df = df.reindex(index=players, columns=list(STATS)).fillna(0).astype('int64')
+    df = df.rename_axis(columns=None).reset_index()
+    df.insert(2, 'matches', 1)
+    return df
+
+def scorer_goals(scorers):
+    """
+    Reads the player, team and goals columns of a scorers table (see SCORER_COLUMNS).
+
+    Returns:
+    - pandas.DataFrame: Columns 'player', 'team' and 'goals'.
+    """
+    columns = {}
+    for name, aliases in SCORER_COLUMNS.items():
+        column = next((alias for alias in aliases if alias in scorers.columns), None)
+        if column is None:
+            raise lf.PageError(f"The scorers table has no {name} column (tried {', '.join(aliases)})")
+        columns[name] = scorers[column]
+        if isinstance(columns[name], pd.DataFrame):  # the first of repeated columns
+            columns[name] = columns[name].iloc[:, 0]
+    return pd.DataFrame({'player': columns['player'].astype(str).to_numpy(),
+                         'team': columns['team'].astype(str).to_numpy(),
+                         'goals': pd.to_numeric(columns['goals'], errors='coerce').fillna(0).astype('int64').to_numpy()})
+
+def team_stats(records):
+    """
+    Turns report records into two rows per match, one for each team, with the result from its perspective.
+    """
+    rows = []
+    for record in records:
+        home_goals, away_goals = lf.split_score(record['wynik'])
+        if home_goals is None or record['gospodarz'] is None:
+            continue
+        rows.append((record['gospodarz'], home_goals, away_goals))
+        rows.append((record['gosc'], away_goals, home_goals))
+    df = pd.DataFrame(rows, columns=['team', 'goals_for', 'goals_against'])
+    df['matches'] = 1
+    df['wins'] = (df['goals_for'] > df['goals_against']).astype('int64')
+    df['draws'] = (df['goals_for'] == df['goals_against']).astype('int64')
+    df['losses'] = (df['goals_for'] < df['goals_against']).astype('int64')
+    df['clean_sheets'] = (df['goals_against'] == 0).astype('int64')
+    df['points'] = 3 * df['wins'] + df['draws']
+    return df[['team'] + TEAM_STATS]
@@ -0,0 +1,15 @@
+# Lightweight front of the scrapers. Names are looked up in utils (or in the export, database, leaderboards and
+# crawler modules) on first use, so importing the package costs almost nothing: pandas, requests and bs4 are
+# loaded only when a scraper actually runs.
+
+import importlib
+
+MODULES = ['utils', 'export', 'database', 'leaderboards', 'crawler']
+
+def __getattr__(name):
+    if name in MODULES:
+        return importlib.import_module(name)
+    try:
+        return getattr(importlib.import_module('utils'), name)
+    except AttributeError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
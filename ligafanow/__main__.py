@@ -0,0 +1,5 @@
+import sys
+
+from ligafanow.cli import main
+
+sys.exit(main())
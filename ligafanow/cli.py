@@ -0,0 +1,130 @@
+# Command line interface.
+#
+# Usage:
+#   python -m ligafanow leagues [--season 29]
+#   python -m ligafanow table 3liga
+#   python -m ligafanow matches 3liga [--round 5] [--team "Kozice Warszawa"]
+#   python -m ligafanow scorers 3liga
+#   python -m ligafanow squad 3liga "Kozice Warszawa"
+#   python -m ligafanow export --all [--path ligafanow_data]
+#
+# The outputs of table, matches, scorers and squad are kept in the cache file for as long as the pages they come
+# from (CACHE_CONFIG['ttl']); a cached output is printed without importing pandas or bs4.
+
+# LIBRARIES NEEDED
+
+import argparse
+import json
+import sys
+
+import utils as lf
+from ligafanow.results import ResultCache
+
+# Command -> (page type deciding how long the output is cached, function producing the DataFrame)
+QUERIES = {
+    'table': ('tabela', lambda args: lf.get_table(args.league, season=args.season)),
+    'matches': ('mecze', lambda args: lf.get_matches(args.league, round_=args.round, team=args.team,
+                                                     season=args.season)),
+    'scorers': ('strzelcy', lambda args: lf.get_scorers(args.league, season=args.season)),
+    'squad': ('druzyna', lambda args: lf.get_squad_details(args.league, args.team, season=args.season)),
+}
+
+# MAIN FUNCTIONS
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'leagues':
+        return leagues(args)
+    if args.command == 'export':
+        return export(args)
+    return query(args)
+
+def query(args):
+    """
+    Prints the result of table, matches, scorers or squad, from the result cache when it is fresh.
+    """
+    page, func = QUERIES[args.command]
+    key = json.dumps([args.command, args.league, args.season, getattr(args, 'round', None),
+                      getattr(args, 'team', None), args.format])
+    results = ResultCache(args.cache) if args.cache else None
+    ttl = None if args.offline else lf.CACHE_CONFIG['ttl'].get(page, lf.CACHE_CONFIG['ttl']['default'])
+
+    body = results.get(key, ttl) if results is not None and not args.refresh else None
+    if body is None:
+        if args.cache:
+            lf.enable_cache(args.cache, offline=args.offline)
+        df = func(args)
+        if df is None:
+            return 1
+        body = render(df, args.format)
+        if results is not None:
+            results.put(key, body)
+    print(body)
+    return 0
+
+def leagues(args):
+    """
+    Prints the leagues of a season and the addresses of their tables.
+    """
+    if args.season is not None and args.cache:
+        lf.enable_cache(args.cache, offline=args.offline)
+    for league, url in lf.season_leagues(args.season).items():
+        print(f'{league}\t{url}')
+    return 0
+
+def export(args):
+    """
+    Exports leagues to partitioned Parquet files (see export.export_season()).
+    """
+    if not args.all and not args.leagues:
+        print('Podaj ligi do eksportu albo --all', file=sys.stderr)
+        return 2
+    import export as ex
+    if args.cache:
+        lf.enable_cache(args.cache, offline=args.offline)
+    summary = ex.export_season(args.path, None if args.all else args.leagues, full=args.full,
+                               workers=args.workers, season=args.season)
+    print(summary.to_string(index=False))
+    return 0
+
+# ASIDE FUNCTIONS
+
+def render(df, format_):
+    """
+    Turns a DataFrame into the text printed by the CLI: an aligned table, CSV or JSON records.
+    """
+    if format_ == 'csv':
+        return df.to_csv(index=False).rstrip('\n')
+    if format_ == 'json':
+        return df.to_json(orient='records', force_ascii=False)
+    return df.to_string(index=False)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ligafanow', description='Data of the Warsaw Liga Fanów')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--season', help='season number, defaults to the current one')
+    common.add_argument('--cache', default='ligafanow_cache.sqlite',
+                        help='SQLite file for downloaded pages and results, "" to disable')
+    common.add_argument('--offline', action='store_true', help='use only what is in the cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('leagues', parents=[common], help='list the leagues of a season')
+    for name, description in [('table', 'league table'), ('matches', 'fixtures and results'),
+                              ('scorers', 'top scorers'), ('squad', 'squad of a team')]:
+        command = commands.add_parser(name, parents=[common], help=description)
+        command.add_argument('league')
+        if name == 'squad':
+            command.add_argument('team')
+        if name == 'matches':
+            command.add_argument('--round', type=int)
+            command.add_argument('--team')
+        command.add_argument('--format', choices=['text', 'csv', 'json'], default='text')
+        command.add_argument('--refresh', action='store_true', help='ignore the cached result')
+
+    command = commands.add_parser('export', parents=[common], help='export leagues to Parquet')
+    command.add_argument('leagues', nargs='*')
+    command.add_argument('--all', action='store_true', help='export every league')
+    command.add_argument('--path', default='ligafanow_data')
+    command.add_argument('--full', action='store_true', help='ignore the previous snapshot')
+    command.add_argument('--workers', type=int)
+    return parser
@@ -0,0 +1,45 @@
+# LIBRARIES NEEDED
+
+import sqlite3
+import threading
+import time
+
+# Rendered results of CLI queries, stored next to the HTTP cache (in the same SQLite file, in a table of their
+# own), so a repeated query is answered without importing pandas or parsing anything.
+
+class ResultCache:
+    """
+    SQLite store of command outputs keyed by the query that produced them.
+
+    Parameters:
+    - path (str): The SQLite file, usually the one of the HTTP cache (CACHE_CONFIG['path']).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, created_at REAL, body TEXT)')
+        self._conn.commit()
+
+    def get(self, key, ttl=None):
+        """
+        Returns the stored output of a query, or None when there is none or it is older than ttl seconds.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT created_at, body FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None or (ttl is not None and time.time() - row[0] >= ttl):
+            return None
+        return row[1]
+
+    def put(self, key, body):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)', (key, time.time(), body))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM results')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -6,14 +6,55 @@
 
 # LIBRARIES NEEDED
 
-import pandas as pd
-import numpy as np
+import contextvars
+import hashlib
+import importlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import urlsplit
+
+# Held while a deferred module is imported, so worker threads never see it half-executed
+_import_lock = threading.Lock()
+
+class _Deferred:
+    """
+    Stands in for the module name, imported on first attribute access instead of now. Importing utils for the league
+    addresses or a cached result then does not pay for pandas, requests and bs4. The import runs under _import_lock
+    and then rebinds the module's global alias, so later lookups go to the module itself.
+    """
 
-import requests
-from bs4 import BeautifulSoup
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+        self._module = None
 
-import re
-from unidecode import unidecode
+    def _load(self):
+        with _import_lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+                globals()[self._alias] = self._module
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._module or self._load(), attribute)
+
+pd = _Deferred('pandas', 'pd')
+np = _Deferred('numpy', 'np')
+requests = _Deferred('requests', 'requests')
+bs4 = _Deferred('bs4', 'bs4')
+
+def unidecode(string):
+    from unidecode import unidecode as _unidecode
+    return _unidecode(string)
 
 # GLOBAL DICTIONARIES
 
@@ -33,78 +74,1312 @@ ligi = {
     '12liga':'https://ligafanow.pl/rozgrywki/tabela/30/223',
     '13liga':'https://ligafanow.pl/rozgrywki/tabela/30/236'
 }
-ligi_strzelcy = {key: value.replace('tabela', 'strzelcy') + '?loadpl=all' for key, value in ligi.items()}
+
+def scorers_urls(ligi):
+    """
+    Turns league table URLs into the URLs of the leagues' scorers pages.
+    """
+    return {key: value.replace('tabela', 'strzelcy') + '?loadpl=all' for key, value in ligi.items()}
+
+ligi_strzelcy = scorers_urls(ligi)
+
+# Season of the addresses in ligi; other seasons are discovered from the site by season_leagues()
+CURRENT_SEASON = '30'
+
+# HTTP SESSION
+
+HTTP_CONFIG = {
+    'pool_size': 10,
+    'timeout': 15,
+    'retries': 3,
+    'backoff_factor': 0.5,
+    'page_retries': 2,  # further attempts of a page after a transient failure in bulk scrapes (see page_result())
+    'max_workers': 8,
+    'rate_limit': 10,  # requests per second per host, None for no limit
+    'fetch_log_size': 1000,  # the latest calls kept in fetch_log, None to keep all of them
+    'headers': {
+        'Accept-Encoding': 'gzip, deflate',
+        'User-Agent': 'Liga-Fanow/1.0 (+https://github.com/kfaryn/Liga-Fanow)',
+    },
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+# Earliest time at which the next request to a given host may start
+_host_next_slot = {}
+_rate_lock = threading.Lock()
+
+# One entry per HTTP call made through fetch(), the latest HTTP_CONFIG['fetch_log_size'] of them
+fetch_log = deque(maxlen=HTTP_CONFIG['fetch_log_size'])
+
+def configure_session(**options):
+    """
+    Updates the HTTP settings shared by all scrapers and drops the current session, so the next request opens
+    a new connection pool with the new settings.
+
+    Parameters:
+    - **options: Any of the keys of HTTP_CONFIG ('pool_size', 'timeout', 'retries', 'backoff_factor',
+      'page_retries', 'max_workers', 'rate_limit', 'fetch_log_size', 'headers').
+
+    Returns:
+    - dict: The updated HTTP_CONFIG.
+    """
+    global _session, fetch_log
+    unknown = set(options) - set(HTTP_CONFIG)
+    if unknown:
+        raise KeyError(f'Unknown HTTP options: {sorted(unknown)}')
+    with _session_lock:
+        HTTP_CONFIG.update(options)
+        if 'fetch_log_size' in options:
+            fetch_log = deque(fetch_log, maxlen=options['fetch_log_size'])
+        if _session is not None:
+            _session.close()
+        _session = None
+    return HTTP_CONFIG
+
+def get_session():
+    """
+    Returns the shared requests.Session, creating it on first use. The session keeps connections to ligafanow.pl
+    alive between calls and retries failed GET requests with exponential backoff.
+
+    Returns:
+    - requests.Session: The pooled session configured from HTTP_CONFIG.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = requests.adapters.Retry(total=HTTP_CONFIG['retries'],
+                                            backoff_factor=HTTP_CONFIG['backoff_factor'],
+                                            status_forcelist=(429, 500, 502, 503, 504),
+                                            allowed_methods=('GET', 'HEAD'))
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_CONFIG['pool_size'],
+                                                    pool_maxsize=HTTP_CONFIG['pool_size'],
+                                                    max_retries=retry)
+            session = requests.Session()
+            session.headers.update(HTTP_CONFIG['headers'])
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+def _wait_for_host(url):
+    """
+    Sleeps until the per-host rate limit from HTTP_CONFIG['rate_limit'] allows another request to the host of url.
+    """
+    rate = HTTP_CONFIG['rate_limit']
+    if not rate:
+        return
+    host = urlsplit(url).netloc
+    with _rate_lock:
+        now = time.monotonic()
+        slot = max(now, _host_next_slot.get(host, now))
+        _host_next_slot[host] = slot + 1.0 / rate
+    if slot > now:
+        time.sleep(slot - now)
+
+# HTTP CACHE
+
+CACHE_CONFIG = {
+    'path': None,  # the SQLite file of the cache, None disables caching
+    'max_bytes': 200 * 1024 * 1024,
+    'offline': False,  # serve only from the cache, never touch the network
+    # Seconds after which a page of the given type is revalidated, None means it never expires
+    'ttl': {
+        'raport': None,
+        'tabela': 6 * 3600,
+        'strzelcy': 6 * 3600,
+        'druzyna': 6 * 3600,
+        'mecze': 3600,
+        'default': 3600,
+    },
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def page_type(url):
+    """
+    Classifies a ligafanow.pl address by the kind of page it points to, which decides how long it is cached.
+
+    Parameters:
+    - url (str): The address of the page.
+
+    Returns:
+    - str: One of 'raport', 'strzelcy', 'tabela', 'mecze', 'druzyna' or 'default'.
+    """
+    path = urlsplit(url).path
+    for kind in ['raport', 'strzelcy', 'tabela', 'mecze', 'druzyna']:
+        if kind in path:
+            return kind
+    return 'default'
+
+class ResponseCache:
+    """
+    Persistent store of HTTP responses keyed by URL, kept in a single SQLite file. Bodies are compressed with zlib
+    and the least recently used entries are evicted once the store grows past max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=CACHE_CONFIG['max_bytes']):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' url TEXT PRIMARY KEY, status INTEGER, headers TEXT, encoding TEXT, content BLOB,'
+            ' etag TEXT, last_modified TEXT, fetched_at REAL, accessed_at REAL, size INTEGER)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        self._conn.commit()
+
+    def get(self, url):
+        """
+        Returns the cached entry of url as a dictionary (with the decompressed 'content'), or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, headers, encoding, content, etag, last_modified, fetched_at FROM responses WHERE url = ?',
+                (url,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE responses SET accessed_at = ? WHERE url = ?', (time.time(), url))
+            self._conn.commit()
+        status, headers, encoding, content, etag, last_modified, fetched_at = row
+        return {
+            'url': url,
+            'status': status,
+            'headers': json.loads(headers),
+            'encoding': encoding,
+            'content': zlib.decompress(content),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': fetched_at,
+        }
+
+    def put(self, url, response):
+        """
+        Stores a successful response under url and evicts old entries if the cache is over its size limit.
+        """
+        content = zlib.compress(response.content)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, response.status_code, json.dumps(dict(response.headers)), response.encoding, content,
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'), now, now, len(content)))
+            self._conn.commit()
+            self._evict()
+
+    def touch(self, url):
+        """
+        Marks the entry of url as freshly validated, e.g. after the server answered 304 Not Modified.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute('UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?', (now, now, url))
+            self._conn.commit()
+
+    def invalidate(self, url=None):
+        """
+        Removes the entry of url from the cache, or every entry when url is None.
+        """
+        with self._lock:
+            if url is None:
+                self._conn.execute('DELETE FROM responses')
+            else:
+                self._conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+            self._conn.commit()
+
+    def size(self):
+        """
+        Returns the total size in bytes of the stored (compressed) bodies.
+        """
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def _evict(self):
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute('SELECT url, size FROM responses ORDER BY accessed_at').fetchall():
+            self._conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def enable_cache(path='ligafanow_cache.sqlite', max_bytes=None, offline=None, ttl=None):
+    """
+    Turns on the persistent response cache used by fetch().
+
+    Parameters:
+    - path (str): The SQLite file in which responses are stored. It is created if it does not exist.
+    - max_bytes (int or None): The size limit of the cache; least recently used pages are evicted beyond it.
+    - offline (bool or None): If True, pages are served only from the cache and the network is never used.
+    - ttl (dict or None): Overrides of CACHE_CONFIG['ttl'] for chosen page types.
+
+    Returns:
+    - ResponseCache: The opened cache.
+    """
+    global _cache
+    with _cache_lock:
+        if max_bytes is not None:
+            CACHE_CONFIG['max_bytes'] = max_bytes
+        if offline is not None:
+            CACHE_CONFIG['offline'] = offline
+        if ttl:
+            CACHE_CONFIG['ttl'].update(ttl)
+        if _cache is not None:
+            _cache.close()
+        CACHE_CONFIG['path'] = path
+        _cache = ResponseCache(path, CACHE_CONFIG['max_bytes'])
+        return _cache
+
+def disable_cache():
+    """
+    Turns off the response cache. The file on disk is kept and can be enabled again later.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = None
+        CACHE_CONFIG['path'] = None
+
+def get_cache():
+    """
+    Returns the active ResponseCache, opening it from CACHE_CONFIG['path'] if needed, or None when caching is off.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None and CACHE_CONFIG['path']:
+            _cache = ResponseCache(CACHE_CONFIG['path'], CACHE_CONFIG['max_bytes'])
+        return _cache
+
+def _is_fresh(entry):
+    ttl = CACHE_CONFIG['ttl'].get(page_type(entry['url']), CACHE_CONFIG['ttl']['default'])
+    return ttl is None or time.time() - entry['fetched_at'] < ttl
+
+def _cached_response(entry):
+    """
+    Rebuilds a requests.Response from a cache entry.
+    """
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.headers = requests.structures.CaseInsensitiveDict(entry['headers'])
+    response.encoding = entry['encoding']
+    response._content = entry['content']
+    response.url = entry['url']
+    return response
+
+# FETCHING
+
+def fetch(url):
+    """
+    Downloads the given url through the shared session and records how long the call took in fetch_log.
+    Requests to the same host are spaced according to HTTP_CONFIG['rate_limit'].
+
+    When the response cache is enabled, fresh pages are served from disk, stale ones are revalidated with
+    ETag/Last-Modified and in offline mode the network is not used at all.
+
+    Parameters:
+    - url (str): The address of the page to download.
+
+    Returns:
+    - requests.Response: The response of the server (or its cached copy).
+    """
+    start = time.perf_counter()
+    cache = get_cache()
+    entry = cache.get(url) if cache is not None else None
+
+    if entry is not None and (CACHE_CONFIG['offline'] or _is_fresh(entry)):
+        response = _cached_response(entry)
+        source = 'cache'
+    elif CACHE_CONFIG['offline']:
+        raise LookupError(f'{url} is not in the cache and offline mode is on')
+    else:
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        _wait_for_host(url)
+        response = get_session().get(url, timeout=HTTP_CONFIG['timeout'], headers=headers)
+        source = 'network'
+        if response.status_code == 304 and entry is not None:
+            cache.touch(url)
+            response = _cached_response(entry)
+            source = 'revalidated'
+        elif response.status_code == 200 and cache is not None:
+            cache.put(url, response)
+
+    seconds = time.perf_counter() - start
+    fetch_log.append({
+        'url': url,
+        'status': response.status_code,
+        'bytes': len(response.content),
+        'seconds': seconds,
+        'source': source,
+    })
+    _record(requests=1, bytes=len(response.content), http_seconds=seconds)
+    return response
+
+def fetch_stats():
+    """
+    Returns the timing of the HTTP calls made through fetch() since the last clear_fetch_log(), at most the latest
+    HTTP_CONFIG['fetch_log_size'] of them.
+
+    Returns:
+    - pandas.DataFrame: One row per call with columns 'url', 'status', 'bytes', 'seconds' and 'source'
+      ('network', 'cache' or 'revalidated').
+    """
+    return pd.DataFrame(fetch_log, columns=['url', 'status', 'bytes', 'seconds', 'source'])
+
+def clear_fetch_log():
+    """
+    Removes all entries from fetch_log.
+    """
+    fetch_log.clear()
+
+def parallel_map(func, items, workers=None):
+    """
+    Applies func to every element of items using a bounded thread pool. Results are returned in the order of
+    items, so the output is the same as [func(item) for item in items].
+
+    Parameters:
+    - func (callable): The function to apply, typically one that downloads a page.
+    - items (iterable): The arguments passed to func.
+    - workers (int or None): The maximum number of concurrent calls. Defaults to HTTP_CONFIG['max_workers'].
+      With 1 the items are processed one by one in the calling thread.
+
+    Returns:
+    - list: The results of func for every element of items.
+    """
+    items = list(items)
+    workers = workers or HTTP_CONFIG['max_workers']
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        # Every call runs in a copy of the caller's context, so its work is counted in the caller's profile
+        futures = [executor.submit(contextvars.copy_context().run, func, item) for item in items]
+        return [future.result() for future in futures]
+
+def iter_parallel(func, items, workers=None):
+    """
+    Applies func to every element of items using a bounded thread pool and yields each result as soon as it is
+    ready. At most 'workers' calls are in flight at any time, so memory does not grow with the number of items.
+
+    Parameters:
+    - func (callable): The function to apply, typically one that downloads a page.
+    - items (iterable): The arguments passed to func. It is consumed lazily.
+    - workers (int or None): The maximum number of concurrent calls. Defaults to HTTP_CONFIG['max_workers'].
+
+    Yields:
+    - The results of func in the order in which they complete.
+    """
+    workers = workers or HTTP_CONFIG['max_workers']
+    items = iter(items)
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for item in items:
+            pending.add(executor.submit(contextvars.copy_context().run, func, item))
+            if len(pending) >= workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+# PARTIAL FAILURES
+
+class PageError(ValueError):
+    """
+    A page was downloaded but does not contain what the scraper expects, e.g. a team page without the squad
+    tables. Downloading it again does not help.
+    """
+
+def is_retryable(error):
+    """
+    Checks whether an exception is a transient network failure (connection error, timeout, HTTP retries of the
+    session exhausted) after which the page may be downloaded successfully later.
+    """
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.RetryError,
+                              requests.exceptions.ChunkedEncodingError))
+
+def page_result(func, url, retries=None):
+    """
+    Calls func(url) and returns a result envelope instead of raising. Transient failures (see is_retryable()) are
+    retried with exponential backoff.
+
+    Parameters:
+    - func (callable): The function downloading and parsing the page, e.g. extract_team.
+    - url (str): The address passed to func.
+    - retries (int or None): The number of further attempts after a transient failure. Defaults to
+      HTTP_CONFIG['page_retries'].
+
+    Returns:
+    - dict: 'url', 'status' ('ok', 'error' for pages that cannot be scraped, 'retryable' for transient failures
+      that lasted through all attempts), 'value' (the result of func, None on failure), 'error' (the repr of the
+      exception, None on success) and 'attempts'.
+    """
+    retries = HTTP_CONFIG['page_retries'] if retries is None else retries
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return {'url': url, 'status': 'ok', 'value': func(url), 'error': None, 'attempts': attempt}
+        except Exception as error:  # jedna zła strona nie może przerwać całego pobierania
+            if is_retryable(error) and attempt <= retries:
+                time.sleep(HTTP_CONFIG['backoff_factor'] * 2 ** (attempt - 1))
+                continue
+            status = 'retryable' if is_retryable(error) else 'error'
+            return {'url': url, 'status': status, 'value': None, 'error': repr(error), 'attempts': attempt}
+
+def parallel_results(func, urls, workers=None, errors=None, retries=None):
+    """
+    The fault-tolerant counterpart of parallel_map(): applies func to every url through page_result().
+
+    Parameters:
+    - func (callable): The function downloading and parsing a page.
+    - urls (iterable of str): The addresses passed to func.
+    - workers (int or None): The maximum number of concurrent calls. Defaults to HTTP_CONFIG['max_workers'].
+    - errors (list or None): If provided, the envelopes of the failed pages are appended to it.
+    - retries (int or None): See page_result().
+
+    Returns:
+    - list of tuple: (url, value) of every page that succeeded, in the order of urls.
+    """
+    results = parallel_map(lambda url: page_result(func, url, retries), urls, workers)
+    if errors is not None:
+        errors.extend(result for result in results if result['status'] != 'ok')
+    return [(result['url'], result['value']) for result in results if result['status'] == 'ok']
+
+def error_report(errors):
+    """
+    Returns the failed pages of a bulk scrape as a table.
+
+    Parameters:
+    - errors (list of dict): Failure envelopes collected through an errors= argument (see page_result()).
+
+    Returns:
+    - pandas.DataFrame: One row per failed page with columns 'url', 'status', 'error' and 'attempts'.
+    """
+    return pd.DataFrame([{key: error.get(key) for key in ['url', 'status', 'error', 'attempts']} for error in errors],
+                        columns=['url', 'status', 'error', 'attempts'])
+
+def map_pages(func, urls, workers=None, errors=None):
+    """
+    Applies func to every url like parallel_map(), or like parallel_results() when errors is provided.
+
+    Returns:
+    - list of tuple: (url, value) of every page that succeeded, in the order of urls.
+    """
+    urls = list(urls)
+    if errors is None:
+        return list(zip(urls, parallel_map(func, urls, workers)))
+    return parallel_results(func, urls, workers, errors)
+
+def iter_pages(func, urls, workers=None, errors=None):
+    """
+    The streaming counterpart of map_pages(): yields the value of every page as soon as it is ready (see
+    iter_parallel()). Pages that fail are skipped and appended to errors when it is provided, otherwise the first
+    failure is raised.
+    """
+    if errors is None:
+        yield from iter_parallel(func, urls, workers)
+        return
+    for result in iter_parallel(lambda url: page_result(func, url), urls, workers):
+        if result['status'] == 'ok':
+            yield result['value']
+        else:
+            errors.append(result)
+
+# INSTRUMENTATION
+
+METRICS_CONFIG = {
+    'json_log': None,  # file to which every finished call is appended as a JSON line, None to keep them in memory only
+    'call_log_size': 1000,  # the latest outermost calls kept in call_log, None to keep all of them
+}
+
+# One CallStats per finished outermost call, the calls made within it are in its .calls
+call_log = deque(maxlen=METRICS_CONFIG['call_log_size'])
+# Running totals per function of every finished call, nested ones included, for metrics_text()
+_call_totals = {}
+_metrics_lock = threading.Lock()
+
+# The CallStats of the calls in progress in the current context, outermost first
+_active_calls = contextvars.ContextVar('ligafanow_active_calls', default=())
+# Time spent in nested sections of the section in progress, so parse and frame times are not counted twice
+_active_section = contextvars.ContextVar('ligafanow_active_section', default=None)
+
+class CallStats:
+    """
+    Measurements of one call of a public function (or of one profile() block).
+
+    Attributes:
+    - function (str): The name of the function.
+    - started_at (float): The Unix time at which the call started.
+    - seconds (float): The wall time of the call.
+    - requests (int): The number of pages requested through fetch(), cached ones included.
+    - bytes (int): The size of the pages.
+    - http_seconds (float): Time spent in fetch(), summed over all threads.
+    - parse_seconds (float): Time spent parsing HTML, summed over all threads.
+    - frame_seconds (float): Time spent building and cleaning DataFrames, summed over all threads.
+    - calls (list of CallStats): The instrumented calls made directly within this one; theirs are in their own
+      .calls.
+    """
+
+    FIELDS = ['requests', 'bytes', 'http_seconds', 'parse_seconds', 'frame_seconds']
+
+    def __init__(self, function):
+        self.function = function
+        self.started_at = time.time()
+        self.seconds = 0.0
+        self.requests = 0
+        self.bytes = 0
+        self.http_seconds = 0.0
+        self.parse_seconds = 0.0
+        self.frame_seconds = 0.0
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, **values):
+        with self._lock:
+            for field, value in values.items():
+                setattr(self, field, getattr(self, field) + value)
+
+    def other_seconds(self):
+        """
+        Returns the wall time not attributed to HTTP, parsing or DataFrames (negative when threads overlapped).
+        """
+        return self.seconds - self.http_seconds - self.parse_seconds - self.frame_seconds
+
+    def as_dict(self):
+        return {'function': self.function, 'started_at': self.started_at, 'seconds': self.seconds,
+                **{field: getattr(self, field) for field in self.FIELDS}, 'other_seconds': self.other_seconds()}
+
+    def __repr__(self):
+        return (f'CallStats({self.function}: {self.seconds:.3f}s, {self.requests} requests, {self.bytes} bytes, '
+                f'http {self.http_seconds:.3f}s, parse {self.parse_seconds:.3f}s, frame {self.frame_seconds:.3f}s)')
+
+@contextmanager
+def _measured_call(function):
+    global call_log
+    stats = CallStats(function)
+    outer = _active_calls.get()
+    token = _active_calls.set(outer + (stats,))
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.seconds = time.perf_counter() - start
+        _active_calls.reset(token)
+        if outer:
+            with outer[-1]._lock:
+                outer[-1].calls.append(stats)
+        with _metrics_lock:
+            if not outer:
+                if call_log.maxlen != METRICS_CONFIG['call_log_size']:
+                    call_log = deque(call_log, maxlen=METRICS_CONFIG['call_log_size'])
+                call_log.append(stats)
+            totals = _call_totals.setdefault(function, dict.fromkeys(['calls', 'seconds'] + CallStats.FIELDS, 0))
+            totals['calls'] += 1
+            for field in ['seconds'] + CallStats.FIELDS:
+                totals[field] += getattr(stats, field)
+            if METRICS_CONFIG['json_log'] is not None:
+                with open(METRICS_CONFIG['json_log'], 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(stats.as_dict()) + '\n')
+
+def _instrumented(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _measured_call(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def _timed(kind):
+    # Adds the time spent in the function, minus nested timed functions, to '<kind>_seconds' of the active calls
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _active_calls.get():
+                return func(*args, **kwargs)
+            section = [0.0]
+            token = _active_section.set(section)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                _active_section.reset(token)
+                parent = _active_section.get()
+                if parent is not None:
+                    parent[0] += elapsed
+                _record(**{f'{kind}_seconds': elapsed - section[0]})
+        return wrapper
+    return decorator
+
+def _record(**values):
+    for stats in _active_calls.get():
+        stats.add(**values)
+
+@contextmanager
+def profile(name='profile'):
+    """
+    Context manager measuring everything done inside it, e.g. a single call of an entry point.
+
+    Usage:
+        with profile() as stats:
+            get_matches('3liga')
+        print(stats, stats.calls)
+
+    Yields:
+    - CallStats: The totals of the block, filled in when it exits, with the outermost instrumented calls made in
+      it in stats.calls (and the calls nested in them in their .calls).
+    """
+    with _measured_call(name) as stats:
+        yield stats
+
+def call_stats(calls=None):
+    """
+    Returns the measurements of instrumented calls as a table.
+
+    Parameters:
+    - calls (list of CallStats or None): The calls to show. Defaults to call_log, i.e. the latest outermost calls.
+
+    Returns:
+    - pandas.DataFrame: One row per call with columns 'function', 'started_at', 'seconds', 'requests', 'bytes',
+      'http_seconds', 'parse_seconds', 'frame_seconds' and 'other_seconds'.
+    """
+    calls = call_log if calls is None else calls
+    return pd.DataFrame([stats.as_dict() for stats in calls],
+                        columns=['function', 'started_at', 'seconds'] + CallStats.FIELDS + ['other_seconds'])
+
+def metrics_text(calls=None):
+    """
+    Returns the per-function totals of instrumented calls in the Prometheus text exposition format.
+
+    Parameters:
+    - calls (list of CallStats or None): The calls to aggregate. Defaults to the running totals of every call since
+      the last clear_call_log(), nested ones included.
+
+    Returns:
+    - str: Counters 'ligafanow_calls_total', 'ligafanow_call_seconds_total', 'ligafanow_requests_total',
+      'ligafanow_bytes_total', 'ligafanow_http_seconds_total', 'ligafanow_parse_seconds_total' and
+      'ligafanow_frame_seconds_total', labelled by function.
+    """
+    if calls is None:
+        with _metrics_lock:
+            totals = pd.DataFrame.from_dict(_call_totals, orient='index',
+                                            columns=['calls', 'seconds'] + CallStats.FIELDS)
+    else:
+        df = call_stats(calls)
+        totals = df.groupby('function')[['seconds'] + CallStats.FIELDS].sum()
+        totals.insert(0, 'calls', df.groupby('function').size())
+    metrics = {
+        'calls': ('calls_total', 'Number of calls'),
+        'seconds': ('call_seconds_total', 'Wall time of the calls'),
+        'requests': ('requests_total', 'Pages requested through fetch()'),
+        'bytes': ('bytes_total', 'Bytes of the requested pages'),
+        'http_seconds': ('http_seconds_total', 'Time spent in fetch()'),
+        'parse_seconds': ('parse_seconds_total', 'Time spent parsing HTML'),
+        'frame_seconds': ('frame_seconds_total', 'Time spent building DataFrames'),
+    }
+    lines = []
+    for column, (name, description) in metrics.items():
+        lines.append(f'# HELP ligafanow_{name} {description}')
+        lines.append(f'# TYPE ligafanow_{name} counter')
+        for function, value in totals[column].items():
+            lines.append(f'ligafanow_{name}{{function="{function}"}} {value:g}')
+    return '\n'.join(lines) + '\n'
+
+def clear_call_log():
+    """
+    Removes all entries from call_log and resets the totals of metrics_text().
+    """
+    with _metrics_lock:
+        call_log.clear()
+        _call_totals.clear()
+
+# HTML PARSING
+
+PARSER_CONFIG = {
+    'backend': None,  # 'selectolax', 'lxml' or 'html.parser', None picks the fastest one installed
+    'processes': None,  # worker processes of parse_pages(), None for one per CPU core
+    'start_method': 'forkserver',  # how worker processes are started, 'spawn' where forkserver is not available
+}
+
+def available_parsers():
+    """
+    Lists the HTML parser backends that can be used in this environment, fastest first.
+
+    Returns:
+    - list of str: A subset of ['selectolax', 'lxml', 'html.parser'].
+    """
+    backends = []
+    try:
+        from selectolax.lexbor import LexborHTMLParser  # noqa: F401
+        backends.append('selectolax')
+    except ImportError:
+        pass
+    try:
+        import lxml  # noqa: F401
+        backends.append('lxml')
+    except ImportError:
+        pass
+    backends.append('html.parser')
+    return backends
+
+def parser_backend():
+    """
+    Returns the name of the HTML parser backend in use, resolving PARSER_CONFIG['backend'] when it is None.
+    """
+    if PARSER_CONFIG['backend'] is None:
+        PARSER_CONFIG['backend'] = available_parsers()[0]
+    return PARSER_CONFIG['backend']
+
+def set_parser_backend(backend=None):
+    """
+    Chooses the HTML parser backend used by all scrapers.
+
+    Parameters:
+    - backend (str or None): 'selectolax', 'lxml' or 'html.parser'. None picks the fastest installed backend.
+
+    Returns:
+    - str: The backend that will be used.
+    """
+    if backend is not None and backend not in available_parsers():
+        raise ValueError(f'Parser backend {backend!r} is not available, choose one of {available_parsers()}')
+    PARSER_CONFIG['backend'] = backend
+    return parser_backend()
+
+def make_soup(html, parse_only=None):
+    """
+    Builds a BeautifulSoup tree with lxml when it is the selected backend (or with html.parser otherwise).
+
+    Parameters:
+    - html (str): The page source.
+    - parse_only (bs4.SoupStrainer or None): If provided, only the matching elements are built into the tree.
+
+    Returns:
+    - bs4.BeautifulSoup: The parsed document.
+    """
+    builder = 'lxml' if parser_backend() == 'lxml' else 'html.parser'
+    return bs4.BeautifulSoup(html, builder, parse_only=parse_only)
+
+def _lexbor(html):
+    from selectolax.lexbor import LexborHTMLParser
+    return LexborHTMLParser(html)
+
+def _node_text(node):
+    return node.text(deep=True).strip()
+
+@_timed('parse')
+def parse_league_table(html):
+    """
+    Reads the first table of a league page.
+
+    Parameters:
+    - html (str): The source of the league table page.
+
+    Returns:
+    - tuple: (headers, text_rows, link_rows) where headers are the texts of all 'th' elements, text_rows holds the
+      stripped text of every cell row by row and link_rows the href of the first link in every cell ('' if none).
+    """
+    text_rows = []
+    link_rows = []
+    if parser_backend() == 'selectolax':
+        table = _lexbor(html).css_first('table')
+        headers = [_node_text(th) for th in table.css('th')]
+        for tr in table.css('tr'):
+            cells = tr.css('td, th')
+            text_rows.append([_node_text(td) for td in cells])
+            links = [td.css_first('a') for td in cells]
+            link_rows.append([link.attributes.get('href') if link is not None else '' for link in links])
+        return headers, text_rows, link_rows
+
+    table = make_soup(html, bs4.SoupStrainer('table')).find('table')
+    headers = [th.text.strip() for th in table.findAll('th')]
+    for tr in table.findAll('tr'):
+        texts = []
+        links = []
+        for td in tr.findAll(['td', 'th']):
+            texts.append(td.text.strip())
+            link = td.find('a')
+            links.append(link.get('href') if link else '')
+        text_rows.append(texts)
+        link_rows.append(links)
+    return headers, text_rows, link_rows
+
+@_timed('parse')
+def parse_results_table(html):
+    """
+    Reads the matches table of a team page, taking the mobile layout of a row when the desktop cells are hidden.
+
+    Parameters:
+    - html (str): The source of the team matches page.
+
+    Returns:
+    - tuple: (headers, rows) with the texts of all 'th' elements and the stripped cell texts of every data row.
+    """
+    rows = []
+    if parser_backend() == 'selectolax':
+        table = _lexbor(html).css_first('table')
+        headers = [_node_text(th) for th in table.css('th')]
+        for tr in table.css('tr')[1:]:  # Skip the first row as it contains headers
+            if tr.css_first('td.hideonmobie') is not None:
+                mobile_data = tr.css_first('span.d-block.d-sm-none')
+                row = [_node_text(mobile_data.css_first('div.text-uppercase'))]
+                row.extend(_node_text(div) for div in mobile_data.css('div.text-center'))
+            else:
+                row = [_node_text(td) for td in tr.css('td, th')]
+            rows.append(row)
+        return headers, rows
+
+    table = make_soup(html, bs4.SoupStrainer('table')).find('table')
+    headers = [th.text.strip() for th in table.findAll('th')]
+    for tr in table.findAll('tr')[1:]:  # Skip the first row as it contains headers
+        row = []
+
+        # Check if the row contains data or nested structure
+        if tr.find('td', class_='hideonmobie'):
+            # Extract data from nested structure
+            mobile_data = tr.find('span', class_='d-block d-sm-none')
+            row.append(mobile_data.find('div', class_='text-uppercase').text.strip())  # Extract mobile data
+            row.extend([td.text.strip() for td in mobile_data.find_all('div', class_='text-center')])
+
+        else:
+            # Extract data from regular structure
+            row.extend([td.text.strip() for td in tr.find_all(['td', 'th'])])
+
+        rows.append(row)
+    return headers, rows
+
+@_timed('parse')
+def parse_report_cells(html):
+    """
+    Reads the match report link of every data row of a team's matches table, in the order of parse_results_table().
+
+    Parameters:
+    - html (str): The source of the team matches page.
+
+    Returns:
+    - list of str: The href of the report link of each row, '' for matches without a report.
+    """
+    if parser_backend() == 'selectolax':
+        table = _lexbor(html).css_first('table')
+        rows = [[a.attributes.get('href') or '' for a in tr.css('a[href]')] for tr in table.css('tr')[1:]]
+    else:
+        table = make_soup(html, bs4.SoupStrainer('table')).find('table')
+        rows = [[a['href'] for a in tr.find_all('a', href=True)] for tr in table.findAll('tr')[1:]]
+    return [next((href for href in hrefs if 'raport' in href and 'veo' not in href), '') for hrefs in rows]
+
+@_timed('parse')
+def parse_links(html):
+    """
+    Returns the href of every link on the page, in document order.
+    """
+    if parser_backend() == 'selectolax':
+        return [a.attributes['href'] for a in _lexbor(html).css('a[href]') if a.attributes['href'] is not None]
+    return [a['href'] for a in make_soup(html, bs4.SoupStrainer('a', href=True)).find_all('a', href=True)]
+
+@_timed('parse')
+def parse_squad_tables(html):
+    """
+    Reads the two squad tables ('mytxablecc' and 'mytxablec') of a team page.
+
+    Parameters:
+    - html (str): The source of the team page.
+
+    Returns:
+    - dict: The table ids mapped to lists of player records (dicts of column name to text), or to None when the table
+      is missing from the page.
+    """
+    ids = ['mytxablecc', 'mytxablec']
+    if parser_backend() == 'selectolax':
+        tree = _lexbor(html)
+        tables = {table_id: tree.css_first(f'table#{table_id}') for table_id in ids}
+        return {table_id: _sx_squad_records(table) if table is not None else None
+                for table_id, table in tables.items()}
+
+    soup = make_soup(html, bs4.SoupStrainer('table', id=ids))
+    tables = {table_id: soup.find('table', {'id': table_id}) for table_id in ids}
+    return {table_id: extract_table_data(table) if table else None for table_id, table in tables.items()}
+
+def _sx_squad_records(table):
+    """
+    The selectolax counterpart of extract_table_data().
+    """
+    header_row = table.css('thead tr')[1]  # Use the second row to get headers with tooltip
+    headers = []
+    for header in header_row.css('th, td'):
+        if 'tooltip' in header.attributes:
+            headers.append(header.attributes['tooltip'].strip())
+        else:
+            headers.append(_node_text(header))
+
+    table_data = []
+    for row in table.css('tbody tr'):
+        table_data.append({headers[i]: _node_text(col) for i, col in enumerate(row.css('td, th'))})
+    return table_data
+
+@_timed('parse')
+def parse_report(html):
+    """
+    Reads a match report page.
+
+    Parameters:
+    - html (str): The source of the match report.
+
+    Returns:
+    - dict: 'title' (the page title or None), 'header' (the text of the 'BoxHeaderTitle' element or None),
+      'h2' (the texts of all 'h2' elements) and 'tables' (for every table with at least one row, a list of records
+      keyed by the texts of its first row).
+    """
+    report = {'title': None, 'header': None, 'h2': [], 'tables': []}
+    if parser_backend() == 'selectolax':
+        tree = _lexbor(html)
+        title = tree.css_first('title')
+        header = tree.css_first('div.BoxHeaderTitle')
+        report['title'] = title.text() if title is not None else None
+        report['header'] = header.text(deep=True, strip=True) if header is not None else None
+        report['h2'] = [_node_text(h2) for h2 in tree.css('h2')]
+        for table in tree.css('table'):
+            rows = table.css('tr')
+            if rows:
+                header_cells = [_node_text(cell) for cell in rows[0].css('th, td')]
+                report['tables'].append([dict(zip(header_cells, [_node_text(cell) for cell in row.css('th, td')]))
+                                         for row in rows[1:]])
+        return report
+
+    soup = make_soup(html)
+    header = soup.find('div', class_='BoxHeaderTitle')
+    report['title'] = soup.title.string if soup.title else None
+    report['header'] = header.get_text(strip=True) if header else None
+    report['h2'] = [h2.text.strip() for h2 in soup.find_all('h2')]
+    for table in soup.find_all('table'):
+        rows = table.find_all('tr')
+        if rows:
+            header_cells = [cell.text.strip() for cell in rows[0].find_all(['th', 'td'])]
+            report['tables'].append([dict(zip(header_cells, [cell.text.strip() for cell in row.find_all(['th', 'td'])]))
+                                     for row in rows[1:]])
+    return report
+
+# LEAGUE PAGES
+
+# Parsed league pages by URL, kept while a league_scope() is open
+_league_pages = {}
+# Parsed match reports by report id and by hash of the page, kept while a league_scope() is open
+_reports = {}
+_report_hashes = {}
+_report_locks = {}
+_league_scope_depth = 0
+_league_lock = threading.RLock()
+
+class LeaguePage:
+    """
+    The league table page parsed once, exposing both the text of every cell and the link found in it.
+
+    Attributes:
+    - url (str): The address of the page.
+    - headers (list of str): The texts of all 'th' elements of the table.
+    - text_rows (list of list of str): The stripped text of every cell, row by row.
+    - link_rows (list of list of str): The href of the first link in every cell ('' when there is none).
+    """
+
+    def __init__(self, url, html):
+        self.url = url
+        self.headers, self.text_rows, self.link_rows = parse_league_table(html)
+
+    def text_table(self):
+        """
+        Returns the raw text table, with the header row still among the data rows.
+        """
+        return pd.DataFrame(self.text_rows, columns=self.headers)
+
+    def link_table(self):
+        """
+        Returns the raw link table, with the header row still among the data rows.
+        """
+        return pd.DataFrame(self.link_rows, columns=self.headers)
+
+@contextmanager
+def league_scope():
+    """
+    Context manager within which every league page and match report is downloaded and parsed at most once. The memoized pages are
+    dropped when the outermost scope exits. All public entry points open a scope, so nested helpers share the page;
+    wrap several calls in one scope to share it between them as well.
+    """
+    global _league_scope_depth
+    with _league_lock:
+        _league_scope_depth += 1
+    try:
+        yield
+    finally:
+        with _league_lock:
+            _league_scope_depth -= 1
+            if _league_scope_depth == 0:
+                _league_pages.clear()
+                _reports.clear()
+                _report_hashes.clear()
+                _report_locks.clear()
+
+def _league_scoped(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with league_scope():
+            return func(*args, **kwargs)
+    return wrapper
+
+def league_page(league, ligi=ligi):
+    """
+    Returns the parsed league table page, reusing the copy memoized in the current league_scope() if there is one.
+
+    Parameters:
+    - league (str): The name of the league.
+    - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+
+    Returns:
+    - LeaguePage: The parsed page.
+    """
+    url = ligi[league]
+    with _league_lock:
+        page = _league_pages.get(url)
+    if page is None:
+        page = LeaguePage(url, fetch(url).text)
+        with _league_lock:
+            if _league_scope_depth:
+                page = _league_pages.setdefault(url, page)
+    return page
+
+def invalidate_league_page(league=None, ligi=ligi):
+    """
+    Drops the memoized page of the given league, or of all leagues when league is None, so the next call downloads
+    it again.
+    """
+    with _league_lock:
+        if league is None:
+            _league_pages.clear()
+        else:
+            _league_pages.pop(ligi[league], None)
+
+# LEAGUE REGISTRY
+
+# Links to league tables and scorers pages: /rozgrywki/tabela/<season>/<division>
+SEASON_LINK = re.compile(r'/rozgrywki/(?:tabela|strzelcy)/(\d+)/(\d+)')
+# Keys of the leagues as in ligi: 'ekstraklasa', '1liga', ..., '13liga'
+LEAGUE_KEY = re.compile(r'ekstraklasa|\d+liga')
+# Menu entries numbered after the word: 'Liga 0' (the ekstraklasa), 'Liga 1', ..., 'Liga 13'
+NUMBERED_LEAGUE = re.compile(r'liga(\d+)')
+
+# Season -> {league: table URL}, filled on demand by season_leagues()
+_season_registry = {}
+# Season -> the address of any page of that season seen so far, the starting point of its discovery
+_season_pages = {}
+_registry_lock = threading.Lock()
+
+def league_key(name):
+    """
+    Turns the name of a division as written on the site ('Ekstraklasa', '1 Liga', '13. liga', or 'Liga 0' ...
+    'Liga 13' as in the menu) into its key in ligi ('ekstraklasa', '1liga', '13liga'). Other names are only
+    lowercased and stripped of everything but letters and digits.
+    """
+    key = re.sub(r'[^a-z0-9]', '', unidecode(name).lower())
+    numbered = NUMBERED_LEAGUE.fullmatch(key)
+    if numbered:
+        key = 'ekstraklasa' if int(numbered[1]) == 0 else f'{int(numbered[1])}liga'
+    return key
+
+def parse_season_links(html):
+    """
+    Finds the links to league tables of any season on a page, in the menus as well as in season selectors.
+
+    Returns:
+    - list of tuple: (season, division, key) for every link, where key is league_key() of its text.
+    """
+    found = []
+    if parser_backend() == 'selectolax':
+        tree = _lexbor(html)
+        nodes = [(node.attributes.get('href') or '', node) for node in tree.css('a[href]')]
+        nodes += [(node.attributes.get('value') or '', node) for node in tree.css('option[value]')]
+        pairs = [(target, _node_text(node)) for target, node in nodes]
+    else:
+        soup = make_soup(html, bs4.SoupStrainer(['a', 'option']))
+        pairs = [(node.get('href') or node.get('value') or '', node.get_text().strip())
+                 for node in soup.find_all(['a', 'option'])]
+    for target, text in pairs:
+        match = SEASON_LINK.search(target)
+        if match:
+            found.append((match[1], match[2], league_key(text)))
+    return found
+
+def discover_seasons(ligi=ligi):
+    """
+    Lists the seasons linked from the current league pages. Downloads one page (through the response cache).
+
+    Returns:
+    - list of str: The season numbers, oldest first.
+    """
+    url = next(iter(ligi.values()))
+    seasons = {_url_season(url)}
+    with _registry_lock:
+        for season, division, _ in parse_season_links(fetch(url).text):
+            seasons.add(season)
+            _season_pages.setdefault(season, f'https://ligafanow.pl/rozgrywki/tabela/{season}/{division}')
+    return sorted(seasons, key=int)
+
+def season_leagues(season=None, ligi=ligi, keys=None):
+    """
+    Returns the league table addresses of a season, in the format of ligi. The divisions of other seasons are read
+    from the site the first time they are needed and then kept for the rest of the session; the pages themselves
+    go through fetch(), so the response cache keeps them between sessions.
+
+    Parameters:
+    - season (int, str or None): The season number. None (or the season of ligi) returns ligi unchanged.
+    - ligi (dict): The addresses returned when season is None.
+    - keys (dict or None): League keys of the divisions of the season, by division ID or by name as written on the
+      site, for menus whose names league_key() cannot read.
+
+    Returns:
+    - dict: League names as keys and the URLs of their tables as values.
+    """
+    if season is None or str(season) == _url_season(next(iter(ligi.values()))):
+        return ligi
+    season = str(season)
+    with _registry_lock:
+        if season in _season_registry and keys is None:
+            return _season_registry[season]
+    if season not in _season_pages:
+        discover_seasons()
+    if season not in _season_pages:
+        raise KeyError(f'Season {season} was not found on the site')
+
+    leagues = links_leagues(parse_season_links(fetch(_season_pages[season]).text), season, ligi, keys)
+    if not leagues:
+        raise KeyError(f'No leagues of season {season} were found on the site, pass their keys= explicitly')
+    with _registry_lock:
+        _season_registry[season] = leagues
+    return leagues
+
+def links_leagues(links, season, ligi=ligi, keys=None):
+    """
+    Names the divisions of a season found by parse_season_links(). A division is named, in this order, by keys,
+    by its menu text when league_key() reads it as a key of ligi ('Ekstraklasa', '3 Liga', 'Liga 3'), or by its ID
+    when ligi has the same one. A division named in none of these ways raises KeyError rather than being guessed,
+    as a season with reordered or renamed divisions would otherwise be stored under the wrong leagues.
+
+    Parameters:
+    - links (list of tuple): (season, division, key) as returned by parse_season_links().
+    - season (int or str): The season number.
+    - ligi (dict): The leagues of the current season.
+    - keys (dict or None): League keys by division ID or by division name.
+
+    Returns:
+    - dict: League names as keys and the URLs of their tables as values, in menu order.
+    """
+    season = str(season)
+    keys = {league_key(str(name)): key for name, key in (keys or {}).items()}
+    known = {SEASON_LINK.search(url)[2]: name for name, url in ligi.items() if SEASON_LINK.search(url)}
+    divisions = {}
+    for found_season, division, key in links:
+        if found_season != season or division in divisions:
+            continue
+        if division in keys or key in keys:
+            divisions[division] = keys.get(division, keys.get(key))
+        elif LEAGUE_KEY.fullmatch(key):
+            divisions[division] = key
+        else:
+            divisions[division] = known.get(division)
+    unnamed = [division for division, name in divisions.items() if name is None]
+    if unnamed:
+        raise KeyError(f'Divisions {unnamed} of season {season} could not be named, pass their keys= explicitly')
+    leagues = {}
+    for division, name in divisions.items():
+        if name is not None and name not in leagues:
+            leagues[name] = f'https://ligafanow.pl/rozgrywki/tabela/{season}/{division}'
+    return leagues
+
+def _url_season(url):
+    match = SEASON_LINK.search(url)
+    return match[1] if match else CURRENT_SEASON
 
 # MAIN FUNCTIONS
 
-def get_table(league, ligi = ligi):
+@_instrumented
+@_league_scoped
+def get_table(league, ligi = ligi, typed=False, season=None):
     """
     Retrieves and parses the league table data from the provided league name using the corresponding URL.
     
     Parameters:
     - league (str): The name of the league for which the table data will be fetched.
     - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+    - typed (bool): If True, the columns get the compact dtypes declared in SCHEMAS['table'].
+    - season (int, str or None): If provided, the league of this season is used instead (see season_leagues()).
     
     Returns:
     - pandas.DataFrame: A DataFrame representing the league table, with headers and data extracted from the HTML
       content of the league's URL. The DataFrame is cleaned and formatted for further analysis.
     """
-    # Get response from url
-    response = requests.get(ligi[league])
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
-    # Find table in url
-    table = soup.find('table')
-    
-    # Empty lists for data
-    headers = []
-    rows = []
-    
-    # Get headers
-    for th in table.findAll('th'):
-        headers.append(th.text.strip())
-        
-    # Get data
-    for tr in table.findAll('tr'):
-        row = []
-        for td in tr.findAll(['td', 'th']):
-            row.append(td.text.strip())
-        rows.append(row)
-        
-    # Create dataframe
-    df = pd.DataFrame(rows, columns=headers)
-    df.columns = df.iloc[0]
-    df = df[1:]
-    df = convert_to_int(df)
-    df = adjust_dataframe(df)
+    ligi = season_leagues(season, ligi)
+    # Create dataframe from the parsed page
+    df = table_frame(league_page(league, ligi))
+    if typed:
+        df = apply_schema(df, 'table')
     
     return df
 
-def get_matches(league, round_=None, team=None, ligi=ligi):
+@_instrumented
+@_league_scoped
+def get_matches(league, round_=None, team=None, ligi=ligi, workers=None, typed=False, processes=None, season=None,
+                errors=None):
     """
     Retrieves and compiles the match data for a given league, with optional filters for specific rounds or teams.
+    The matches pages of all teams are downloaded concurrently.
 
     Parameters:
     - league (str): The name of the league for which match data will be fetched.
     - round_ (int or None): If provided, filters the match data to include only matches from the specified round.
     - team (str or None): If provided, filters the match data to include only matches involving the specified team.
     - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+    - workers (int or None): The maximum number of teams fetched at once. Defaults to HTTP_CONFIG['max_workers'];
+      1 fetches the teams one after another.
+    - typed (bool): If True, the columns get the compact dtypes declared in SCHEMAS['matches'], with the score
+      split into home and away goals and a 'Termin' datetime.
+    - processes (int or None): If provided, the matches pages are parsed in this many worker processes (see
+      parse_pages()) while the downloads stay in threads. The result is the same as without it.
+    - season (int, str or None): If provided, the league of this season is used instead (see season_leagues()).
+    - errors (list or None): If provided, pages that fail are skipped and their envelopes (see page_result())
+      are appended to it, so the result is built from the pages that succeeded. By default the first failure
+      is raised.
 
     Returns:
     - pandas.DataFrame: A DataFrame representing the match data for the specified league. The DataFrame is cleaned
       and formatted for further analysis. Optional filters based on round or team are applied if provided.
     """
-    links = table_of_links(league)
-    wyniki = []
-    for zespol in links['Zespół']:
-        wynik = take_table_results(extract_mecze_links(zespol))
-        # Przykład użycia
-        wynik['Kol.'] = wynik['Kol.'].apply(extract_round)   
-        wyniki.append(wynik)
-    df = pd.concat(wyniki)
-    df = df.drop_duplicates()
-    df = convert_to_int(df)
-    df.sort_values(['Kol.', 'Godz.'], ascending=[False, True], inplace=True)  # Dodano inplace=True
+    ligi = season_leagues(season, ligi)
+    links = table_of_links(league, ligi)
+    if processes is None:
+        wyniki = [wynik for _, wynik in map_pages(team_results, links['Zespół'], workers, errors)]
+    else:
+        # Strony pobierane w wątkach, parsowanie tabel w osobnych procesach
+        matches_links = [link for _, link in map_pages(extract_mecze_links, links['Zespół'], workers, errors)]
+        wyniki = parse_pages('results', matches_links, workers, processes, errors)
+        for wynik in wyniki:
+            wynik['Kol.'] = wynik['Kol.'].apply(extract_round)
+    df = combine_results(wyniki)
     
     # When round added
     if round_ is not None:
@@ -115,78 +1390,188 @@ def get_matches(league, round_=None, team=None, ligi=ligi):
         df = df[(df['Gospodarz'] == team) | (df['Gość'] == team)]      
     
     df = df.reset_index(drop=True)
+    if typed:
+        df = apply_schema(df, 'matches')
     
     return df
 
-def get_squad_details(league, team, ligi=ligi):
-    links = table_of_links(league)
+@_instrumented
+@_league_scoped
+def refresh_matches(league, state, ligi=ligi, workers=None, typed=False, season=None, errors=None):
+    """
+    Incremental get_matches(): the league table is compared with the snapshot in state and only the teams whose
+    number of games played ('Mecze_rozegrane') or form changed have their matches page downloaded again. The
+    matches of the other teams are taken from the snapshot.
+
+    Parameters:
+    - league (str): The name of the league.
+    - state (dict): The snapshot left by an earlier call, updated in place. An empty dict downloads every team.
+      It holds only JSON types, so it can be stored with json.dump() between runs.
+    - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+    - workers (int or None): The maximum number of teams fetched at once. Defaults to HTTP_CONFIG['max_workers'].
+    - typed (bool): If True, the columns get the compact dtypes declared in SCHEMAS['matches'].
+    - season (int, str or None): If provided, the league of this season is used instead (see season_leagues()).
+    - errors (list or None): If provided, teams whose pages fail keep their previous snapshot (and are tried
+      again next time) and the failures are appended to it (see page_result()).
+
+    Returns:
+    - pandas.DataFrame: The same table as get_matches(league, ligi=ligi). The links of the teams downloaded in
+      this call are listed in state['changed'], the report links of every team in state['teams'][link]['reports'].
+    """
+    ligi = season_leagues(season, ligi)
+    teams = state.setdefault('teams', {})
+    links = list(table_of_links(league, ligi)['Zespół'])
+    fingerprints = team_fingerprints(league_page(league, ligi))
+
+    changed = [link for link in links if teams.get(link, {}).get('fingerprint') != fingerprints.get(link)]
+    snapshots = map_pages(team_snapshot, changed, workers, errors)
+    for link, snapshot in snapshots:
+        teams[link] = dict(snapshot, fingerprint=fingerprints.get(link))
+    # Drużyny, których nie ma już w tabeli
+    for link in set(teams) - set(links):
+        del teams[link]
+    state['changed'] = [link for link, _ in snapshots]
+
+    df = combine_results([pd.DataFrame(teams[link]['rows'], columns=teams[link]['columns'])
+                          for link in links if link in teams])
+    df = df.reset_index(drop=True)
+    if typed:
+        df = apply_schema(df, 'matches')
+    return df
+
+@_instrumented
+@_league_scoped
+def get_squad_details(league, team, ligi=ligi, typed=False, season=None):
+    ligi = season_leagues(season, ligi)
+    links = table_of_links(league, ligi)
     try:
         link = links.loc[links['Zespół'].str.contains(adjust_team_name(team)), 'Zespół'].iloc[0]
-        df = extract_team(link)
+        df = extract_team(link, typed=typed)
         return df
     except: 
         print('Podany zespół nie został znaleziony sprawdź pisownię ponownie')
         
-def get_match_details(league, team, kolejka=None, opponent=None):
+@_instrumented
+@_league_scoped
+def get_match_details(league, team, kolejka=None, opponent=None, typed=False, ligi=ligi, season=None):
+    ligi = season_leagues(season, ligi)
 
     if kolejka is not None:
-        matches = get_matches_links(league, team)
+        matches = get_matches_links(league, team, kolejka=kolejka, ligi=ligi)
         link = matches[matches['kolejka'].astype(str).str.strip().eq(str(kolejka).strip())].link.iloc[0]
     elif opponent is not None:
-        matches = get_matches_links(league, team)
+        matches = get_matches_links(league, team, opponent=opponent, ligi=ligi)
         link = matches[matches['przeciwnik'].astype(str).str.strip().str.upper().eq(str(opponent).strip().upper())].link.iloc[0]
     else:
         print('Nie podano kolejki ani przeciwnika')
         link=None
 
-    return match_details(link)
+    return match_details(link, typed=typed)
 
-# ASIDE FUNCTIONS
-
-def table_of_links(league, ligi = ligi):
+@_instrumented
+@_league_scoped
+def get_matches_details(league, keys='all', typed=False, workers=None, ligi=ligi, season=None, errors=None):
     """
-    Retrieves and extracts a table with columns containing links from the specified league's URL.
+    Batch get_match_details(): the keys are looked up in the matches tables of the teams involved, and only the
+    distinct reports they select are downloaded, each once (concurrently).
 
     Parameters:
-    - league (str): The name of the league for which the table with links will be extracted.
+    - league (str): The name of the league.
+    - keys (list of tuple or str): (team, kolejka) or (team, opponent) pairs, where a number (or a string of
+      digits) is read as the round and anything else as the opponent's name. 'all' returns every match of the
+      league. Keys that select no report, including those naming a team not in the league or a match not played
+      yet, are printed and skipped.
+    - typed (bool): If True, the columns get the compact dtypes declared in SCHEMAS['report'].
+    - workers (int or None): The maximum number of pages downloaded at once. Defaults to HTTP_CONFIG['max_workers'].
     - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+    - season (int, str or None): If provided, the league of this season is used instead (see season_leagues()).
+    - errors (list or None): If provided, pages that fail are skipped and their envelopes (see page_result())
+      are appended to it, so the result is built from the pages that succeeded. By default the first failure
+      is raised. Keys that select no report are appended to it as well, as envelopes with status 'error', the
+      team link as 'url' (None for unknown teams) and the key as 'key'.
 
     Returns:
-    - pandas.DataFrame: A DataFrame representing a table with columns containing links extracted from the HTML
-      content of the league's URL. The DataFrame includes headers and link columns. Links are extracted from 'a' tags
-      within 'td' elements of the HTML table. If a 'td' element contains no link, an empty string is appended.
+    - pandas.DataFrame: The players tables of the selected matches (as get_match_details()) with the report
+      identifier in the first column, 'match_id'. Every match appears once, even when several keys select it.
     """
-    # Get response from URL
-    response = requests.get(ligi[league])
-    soup = BeautifulSoup(response.text, 'html.parser')
+    ligi = season_leagues(season, ligi)
+    links = table_of_links(league, ligi)
+    # Jeden indeks raportów: każdy mecz pobierany raz, choć widnieje u obu drużyn
+    report_links = {}
+    if keys == 'all':
+        for _, team_reports in map_pages(reports_links, list(links['Zespół']), workers, errors):
+            for link in team_reports:
+                report_links.setdefault(report_id(link), link)
+    else:
+        # Klucze są dopasowywane do tabel meczów drużyn, więc pobierane są tylko potrzebne raporty
+        team_links = {}
+        for team in dict.fromkeys(team for team, _ in keys):
+            found = links.loc[links['Zespół'].str.contains(adjust_team_name(team)), 'Zespół']
+            team_links[team] = None if found.empty else found.iloc[0]
+        fixtures = dict(map_pages(team_fixtures, [link for link in team_links.values() if link], workers, errors))
+        missing = []
+        for team, key in keys:
+            wanted = _fixture_reports(fixtures.get(team_links[team]), team, key)
+            if not wanted:
+                missing.append((team, key))
+            for link in wanted:
+                report_links.setdefault(report_id(link), link)
+        if missing:
+            print(f'Nie znaleziono meczów: {missing}')
+            if errors is not None:
+                errors.extend({'url': team_links[team], 'status': 'error', 'value': None, 'key': (team, key),
+                               'error': repr(KeyError(f'No match of {team} for {key!r}')), 'attempts': 0}
+                              for team, key in missing)
+    records = [record for _, record in map_pages(report_record, report_links.values(), workers, errors)]
+
+    frames = [record['players'].assign(match_id=record['match_id']) for record in records]
+    if not frames:
+        return pd.DataFrame(columns=['match_id'])
+    df = pd.concat(frames)
+    df = df[['match_id'] + [column for column in df.columns if column != 'match_id']]
+    if typed:
+        df = apply_schema(df, 'report')
+    return df
 
-    # Find the table in the URL
-    table = soup.find('table')
+@_instrumented
+def get_scorers(league, ligi_strzelcy=ligi_strzelcy, season=None):
+    """
+    Retrieves the scorers table of a league from its 'strzelcy' page.
 
-    # Empty lists for data
-    headers = []
-    link_columns = []
+    Parameters:
+    - league (str): The name of the league.
+    - ligi_strzelcy (dict): A dictionary containing league names as keys and the URLs of their scorers pages.
+    - season (int, str or None): If provided, the league of this season is used instead (see season_leagues()).
 
-    # Get headers
-    for th in table.findAll('th'):
-        headers.append(th.text.strip())
+    Returns:
+    - pandas.DataFrame: The scorers table with whole-number columns converted to int.
+    """
+    if season is not None:
+        ligi_strzelcy = scorers_urls(season_leagues(season))
+    response = fetch(ligi_strzelcy[league])
+    headers, text_rows, _ = parse_league_table(response.text)
+    rows = [row for row in text_rows if len(row) == len(headers) and row != headers]
+    df = pd.DataFrame(rows, columns=headers)
+    df = convert_to_int(df)
+    return df
 
-    # Get data
-    for tr in table.findAll('tr'):
-        row = []
-        for td in tr.findAll(['td', 'th']):
-            # Check if the td tag contains an 'a' tag (link)
-            link = td.find('a')
-            if link:
-                # If there is a link, append the link's href attribute
-                row.append(link.get('href'))
-            else:
-                # If there is no link, append an empty string
-                row.append('')
-        link_columns.append(row)
+# ASIDE FUNCTIONS
+
+def table_of_links(league, ligi = ligi):
+    """
+    Retrieves and extracts a table with columns containing links from the specified league's URL.
+
+    Parameters:
+    - league (str): The name of the league for which the table with links will be extracted.
+    - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
 
-    # Create a DataFrame with link columns
-    df = pd.DataFrame(link_columns, columns=headers)
+    Returns:
+    - pandas.DataFrame: A DataFrame representing a table with columns containing links extracted from the HTML
+      content of the league's URL. The DataFrame includes headers and link columns. Links are extracted from 'a' tags
+      within 'td' elements of the HTML table. If a 'td' element contains no link, an empty string is appended.
+    """
+    # Create a DataFrame with link columns from the parsed page
+    df = league_page(league, ligi).link_table()
 
     # Remove rows with all empty values
     df = df.replace('', pd.NA).dropna(how='all')
@@ -198,6 +1583,18 @@ def table_of_links(league, ligi = ligi):
 
     return df
 
+@_timed('frame')
+def table_frame(page):
+    """
+    Builds the cleaned league table (see get_table()) from a parsed LeaguePage.
+    """
+    df = page.text_table()
+    df.columns = df.iloc[0]
+    df = df[1:]
+    df = convert_to_int(df)
+    df = adjust_dataframe(df)
+    return df
+
 def triple_strings(list_):
     """
     Formats data from league tables by grouping every three consecutive elements with varying space separations into
@@ -254,6 +1651,7 @@ def string_divide(string, min_space_number=2):
 
     return substrings
 
+@_timed('frame')
 def convert_to_int(df):
     """
     Converts columns of a DataFrame to the int type where possible.
@@ -264,102 +1662,335 @@ def convert_to_int(df):
     Returns:
     - pandas.DataFrame: Modified DataFrame.
     """
-    for column in df.columns:
-        try:
-            df[column] = df[column].astype(int)
-        except ValueError:
-            pass  # If conversion is not possible, proceed to the next column
+    for position in range(df.shape[1]):
+        values = df.iloc[:, position]
+        if pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values):
+            continue
+        if pd.api.types.is_numeric_dtype(values):
+            convertible = values.notna().all()
+        else:
+            convertible = (pd.api.types.infer_dtype(values, skipna=False) == 'string'
+                           and values.str.fullmatch(INT_PATTERN).all())
+        if convertible:
+            df.isetitem(position, values.astype(int))
     return df
 
-def divide_events(text):
-    pattern = re.compile(r'([PWR]) \d{4}-\d{2}-\d{2} \d{2}:\d{2}')
-    # Wyszukiwanie pasujących sekwencji w tekście
-    matches = pattern.findall(text)
+INT_PATTERN = re.compile(r'\s*[-+]?\d+\s*')
+
+# SCHEMAS
+
+# Statistic columns of the squad table on a team page
+SQUAD_STATS = ['Liczba wystepów', 'Liczba bramek', 'Asysty', 'Kanadyjcztk', 'Superstar', 'Top6', 'MVP',
+               'Czerwone kartki', 'Zółte kartki', 'Stracone bramki', 'Samobój', 'Obronione karne', 'Czyste konto',
+               'Gold Team']
+
+# Declared dtypes of the scraper outputs, used when they are called with typed=True. Every column the site shows
+# is listed, so typed frames of different teams, leagues and seasons concatenate without losing their dtypes.
+# Names are 'string' rather than 'category': categories built per frame differ and fall back to text on concat.
+# Columns not listed (added to the site later) keep the dtype they were scraped with.
+SCHEMAS = {
+    'table': {
+        'Poz': 'int8', 'Zespół': 'string', 'Mecze_rozegrane': 'int8', 'Pkt.': 'int16', 'Z': 'int8', 'R': 'int8',
+        'P': 'int8', 'BZ': 'int16', 'BS': 'int16', '+/-': 'int16', 'Forma': 'string',
+    },
+    'matches': {
+        'Kol.': 'Int8', 'Data': 'datetime64[ns]', 'Godz.': 'string', 'Gospodarz': 'string', '': 'string',
+        'Gość': 'string', 'Video': 'string', 'Sędzia': 'string', 'Boisko': 'string', 'Raport': 'string',
+    },
+    'squad': {
+        'Imie i nazwisko': 'string', 'Numer': 'Int16', **dict.fromkeys(SQUAD_STATS, 'Int16'), 'ID': 'string',
+    },
+    'report': {
+        '': 'string', 'Imie i nazwisko': 'string', 'Wydarzenie': 'string', 'Ilość': 'Int16', 'Zespół': 'string',
+        'match_id': 'string',
+    },
+}
 
-    # Gromadzenie rodzajów wydarzeń
-    event_types = [match[0] for match in matches]
+# A played score such as '7 : 4'; the cell may also hold the text of other links, so it is searched, not matched
+SCORE_PATTERN = re.compile(r'(?P<gospodarz>\d+)\s*:\s*(?P<gosc>\d+)')
 
-    # Tworzenie stringa z rodzajami wydarzeń, oddzielonymi przecinkami
-    result_string = ",".join(event_types)
-    
-    return result_string
+def score_column(df):
+    """
+    Finds the score column of a matches table. On the site it has no header and sits between 'Gospodarz' and
+    'Gość'; when several columns lie between them, the one holding the most scores is taken. A column named
+    'Wynik' (as in team_form_df()) is used when the table has no 'Gospodarz' and 'Gość'.
+
+    Parameters:
+    - df (pandas.DataFrame): A matches table, e.g. the output of get_matches().
+
+    Returns:
+    - int or None: The position of the score column, or None when the table has none.
+    """
+    columns = list(df.columns)
+    if 'Gospodarz' in columns and 'Gość' in columns:
+        between = list(range(columns.index('Gospodarz') + 1, columns.index('Gość')))
+        if between:
+            return max(between, key=lambda position: df.iloc[:, position].map(
+                lambda value: SCORE_PATTERN.search(str(value)) is not None).sum())
+    if 'Wynik' in columns:
+        return columns.index('Wynik')
+    return None
+
+def split_score(score):
+    """
+    Splits a score such as '3 : 2' into home and away goals.
+
+    Returns:
+    - tuple: (home_goals, away_goals) as ints, or (None, None) for matches not played yet.
+    """
+    match = SCORE_PATTERN.search(str(score))
+    if not match:
+        return None, None
+    return int(match['gospodarz']), int(match['gosc'])
 
+@_timed('frame')
+def apply_schema(df, kind):
+    """
+    Gives a scraped DataFrame compact, explicit dtypes.
+
+    Parameters:
+    - df (pandas.DataFrame): The output of get_table() ('table'), get_matches() ('matches'), extract_team()
+      ('squad') or match_details() ('report').
+    - kind (str): One of the keys of SCHEMAS.
+
+    Returns:
+    - pandas.DataFrame: A copy with the dtypes declared in SCHEMAS[kind]; other columns are left as they are. For
+      'matches' the score is split into the 'Bramki gospodarza' and 'Bramki gościa' columns and the date and hour
+      are combined into the 'Termin' datetime.
+    """
+    schema = SCHEMAS[kind]
+    df = df.copy()
+    score = score_column(df) if kind == 'matches' else None
+    for position, column in enumerate(df.columns):
+        values = df.iloc[:, position]
+        dtype = 'string' if position == score else schema.get(column)
+        if dtype is None:
+            continue
+        elif dtype.lower().startswith('int'):
+            typed = pd.to_numeric(values, errors='coerce').astype(dtype)
+        elif dtype.startswith('datetime'):
+            typed = pd.to_datetime(values, errors='coerce', format='mixed').astype(dtype)
+        else:
+            typed = values.astype(dtype)
+        df.isetitem(position, typed)
+
+    if kind == 'matches':
+        if score is not None:
+            goals = df.iloc[:, score].astype(str).str.extract(SCORE_PATTERN)
+        else:
+            goals = pd.DataFrame(index=df.index, columns=['gospodarz', 'gosc'])
+        df['Bramki gospodarza'] = pd.to_numeric(goals['gospodarz']).astype('Int8')
+        df['Bramki gościa'] = pd.to_numeric(goals['gosc']).astype('Int8')
+        if 'Data' in df.columns:
+            date = df['Data'].astype(str)
+            if 'Godz.' in df.columns:
+                date = date + ' ' + df['Godz.'].astype(str)
+            df['Termin'] = pd.to_datetime(date, errors='coerce', format='mixed').astype('datetime64[ns]')
+    return df
+
+# Event type and start of a single match in the 'Forma' column of the league table
+EVENT_PATTERN = re.compile(r'([PWR]) \d{4}-\d{2}-\d{2} \d{2}:\d{2}')
+
+# A whole match in the raw 'Forma' text: the fields after the date are separated by at least two spaces
+FORM_PATTERN = re.compile(
+    r'(?P<Typ>[PWR])\s+(?P<Data>\d{4}-\d{2}-\d{2})\s+(?P<Czas>\d{2}:\d{2})'
+    r'\s+(?P<Druzyna1>.+?)\s{2,}(?P<Wynik>.+?)\s{2,}(?P<Druzyna2>.+?)\s{2,}(?P<Arena>.+?)'
+    r'\s*(?=[PWR]\s+\d{4}-\d{2}-\d{2} \d{2}:\d{2}|$)'
+)
+
+def divide_events(text):
+    """
+    Returns the event types (P, W or R) of the matches in a 'Forma' string, separated by commas.
+    """
+    return ",".join(EVENT_PATTERN.findall(text))
+
+@_timed('frame')
 def adjust_dataframe(df):
     df = df.replace('', pd.NA).dropna(axis=1, how='all')
     # Linijka do poprawy jeśli jakieś wartości są uzupełnione
     df.columns = ['Poz', 'Zespół', 'Mecze_rozegrane', 'Pkt.', 'Pkt.', 'Z', 'R', 'P', 'BZ', 'BS', '+/-','Forma']
-    df['Forma'] = df['Forma'].apply(lambda x: divide_events(x))
+    df['Forma'] = df['Forma'].str.findall(EVENT_PATTERN).str.join(',').astype(str)
     df = df.sort_values('Poz')
     df = df.reset_index(drop=True)
     return df
 
+@_timed('frame')
+def form_df(df):
+    """
+    Parses the raw 'Forma' column of every team at once into one long DataFrame with a row per match.
+
+    Parameters:
+    - df (pandas.DataFrame): A table with the columns 'Zespół' and the raw 'Forma' text, e.g. from raw_table().
+
+    Returns:
+    - pandas.DataFrame: Columns 'Zespół', 'Typ' (categorical P/W/R), 'Data' (datetime of the match),
+      'Drużyna 1', 'Wynik', 'Drużyna 2', 'Przeciwnik' and 'Arena', in the order of the matches on the page.
+    """
+    matches = df['Forma'].astype(str).str.extractall(FORM_PATTERN)
+    teams = df['Zespół'].reindex(matches.index.get_level_values(0)).to_numpy()
+
+    form = pd.DataFrame({
+        'Zespół': teams,
+        'Typ': pd.Categorical(matches['Typ'], categories=['W', 'R', 'P']),
+        'Data': pd.to_datetime(matches['Data'] + ' ' + matches['Czas'], format='%Y-%m-%d %H:%M'),
+        'Drużyna 1': matches['Druzyna1'].to_numpy(),
+        'Wynik': matches['Wynik'].to_numpy(),
+        'Drużyna 2': matches['Druzyna2'].to_numpy(),
+        'Arena': matches['Arena'].to_numpy(),
+    })
+    form.insert(6, 'Przeciwnik', np.where(form['Drużyna 1'] == form['Zespół'], form['Drużyna 2'], form['Drużyna 1']))
+    return form.reset_index(drop=True)
+
+def raw_table(league, ligi=ligi):
+    """
+    Returns the league table with the columns 'Zespół' and 'Forma' as they appear on the page, i.e. before
+    get_table() reduces the form to event types.
+    """
+    rows = league_page(league, ligi).text_rows
+    df = pd.DataFrame([[row[1], row[-1]] for row in rows[1:] if len(row) > 1], columns=['Zespół', 'Forma'])
+    return df
+
+@_instrumented
+@_league_scoped
+def league_form(league, ligi=ligi, season=None):
+    """
+    Retrieves the recent matches of every team in the league as one long DataFrame (see form_df()).
+    """
+    return form_df(raw_table(league, season_leagues(season, ligi)))
+
+@_instrumented
 def team_form_df(df, team):
-    data = df[df['Zespół'] == team]['Forma'][0] 
-    
-    # Podzielenie danych na wiersze
-    rows = re.split(r'([PWR])\s+(\d{4}-\d{2}-\d{2} \d{2}:\d{2})', data)[1:]
-    # Columns
-    columns = ["Typ", "Data", "Czas", "Drużyna 1", "Wynik", "Drużyna 2", "Arena"]
-    team_df = pd.DataFrame([row.split()[0:3] + [string_divide(row)[1]] + [string_divide(row)[2]]+ [string_divide(row)[3]] + [string_divide(row)[4]] for row in triple_strings(rows)], columns=columns)
+    """
+    Returns the matches listed in the raw 'Forma' text of a single team.
+
+    Parameters:
+    - df (pandas.DataFrame): A table with the columns 'Zespół' and the raw 'Forma' text.
+    - team (str): The name of the team.
+
+    Returns:
+    - pandas.DataFrame: Columns 'Typ', 'Data', 'Czas', 'Drużyna 1', 'Wynik', 'Drużyna 2' and 'Arena' as strings.
+    """
+    data = df.loc[df['Zespół'] == team, 'Forma'].iloc[0]
+    team_df = pd.Series([data]).str.extractall(FORM_PATTERN).reset_index(drop=True)
+    team_df.columns = ["Typ", "Data", "Czas", "Drużyna 1", "Wynik", "Drużyna 2", "Arena"]
     return team_df
 
 def extract_mecze_links(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    response = fetch(url)
 
-    mecze_links = []
-    for link in soup.find_all('a', href=True):
-        if 'mecze' in link['href']:
-            mecze_links.append(link['href'])
+    mecze_links = [href for href in parse_links(response.text) if 'mecze' in href]
+    if not mecze_links:
+        raise PageError(f'No link to the matches page on {url}')
 
     return mecze_links[0]
 
 def extract_mecze_details_links(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    response = fetch(url)
+    return report_hrefs(response.text)
 
-    mecze_details_links = []
-    for link in soup.find_all('a', href=True):
-        if 'raport' in link['href'] and 'veo' not in link['href']:
-            mecze_details_links.append(link['href'])
+def report_hrefs(html):
+    """
+    Returns the match report links found on a team's matches page, relative to the site root.
+    """
+    mecze_details_links = [href for href in parse_links(html) if 'raport' in href and 'veo' not in href]
 
-    return list(set(mecze_details_links))
+    # Usuń duplikaty, zachowując kolejność ze strony
+    return list(dict.fromkeys(mecze_details_links))
 
-def take_table_results(url):
+def team_results(url):
     """
-    Function that takes a table of league from the given url
+    Downloads the matches table of a single team.
+
+    Parameters:
+    - url (str): The link to the team page, as found in the 'Zespół' column of table_of_links().
+
+    Returns:
+    - pandas.DataFrame: The team's matches table with the round number extracted into the 'Kol.' column.
     """
-    # Get response from url
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+    wynik = take_table_results(extract_mecze_links(url))
+    wynik['Kol.'] = wynik['Kol.'].apply(extract_round)
+    return wynik
 
-    # Find table in url
-    table = soup.find('table')
+@_timed('frame')
+def combine_results(wyniki):
+    """
+    Joins the matches tables of several teams into one league fixtures table (see get_matches()): every match
+    appears once, the latest round first.
+    """
+    if not wyniki:
+        raise PageError('No matches table could be read')
+    df = pd.concat(wyniki)
+    df = df.drop_duplicates()
+    df = convert_to_int(df)
+    df.sort_values(['Kol.', 'Godz.'], ascending=[False, True], inplace=True)  # Dodano inplace=True
+    return df
 
-    # Empty lists for data
-    headers = []
-    rows = []
+def team_fixtures(url):
+    """
+    Downloads the matches table of a single team together with the report link of every match.
 
-    # Get headers
-    for th in table.findAll('th'):
-        headers.append(th.text.strip())
+    Parameters:
+    - url (str): The link to the team page, as found in the 'Zespół' column of table_of_links().
 
-    # Get data
-    for tr in table.findAll('tr')[1:]:  # Skip the first row as it contains headers
-        row = []
+    Returns:
+    - pandas.DataFrame: The team's matches table (as team_results()) with the absolute address of the match report
+      in the 'link' column, None for matches without a report.
+    """
+    html = fetch(extract_mecze_links(url)).text
+    wynik = results_frame(html)
+    wynik['Kol.'] = wynik['Kol.'].apply(extract_round)
+    reports = parse_report_cells(html)
+    if len(reports) != len(wynik):
+        raise PageError(f'The report links do not line up with the matches table of {url}')
+    wynik['link'] = ['https://ligafanow.pl/' + href if href else None for href in reports]
+    return wynik
+
+def team_snapshot(url):
+    """
+    Downloads the matches page of a team once and keeps what refresh_matches() needs from it.
 
-        # Check if the row contains data or nested structure
-        if tr.find('td', class_='hideonmobie'):
-            # Extract data from nested structure
-            mobile_data = tr.find('span', class_='d-block d-sm-none')
-            row.append(mobile_data.find('div', class_='text-uppercase').text.strip())  # Extract mobile data
-            row.extend([td.text.strip() for td in mobile_data.find_all('div', class_='text-center')])
+    Parameters:
+    - url (str): The link to the team page, as found in the 'Zespół' column of table_of_links().
 
-        else:
-            # Extract data from regular structure
-            row.extend([td.text.strip() for td in tr.find_all(['td', 'th'])])
+    Returns:
+    - dict: 'columns' and 'rows' of the matches table (as in team_results()) and 'reports', the absolute links
+      of the team's match reports (as in reports_links()).
+    """
+    html = fetch(extract_mecze_links(url)).text
+    wynik = results_frame(html)
+    wynik['Kol.'] = wynik['Kol.'].apply(extract_round)
+    return {
+        'columns': list(wynik.columns),
+        'rows': wynik.astype(object).where(wynik.notna(), None).values.tolist(),
+        'reports': ['https://ligafanow.pl/' + href for href in report_hrefs(html)],
+    }
+
+def team_fingerprints(page):
+    """
+    Reads the number of games played and the raw form of every team from a parsed league page.
 
-        rows.append(row)
+    Returns:
+    - dict: Team link -> [games played, form text]. A change in either means the team has played since.
+    """
+    team_column = page.headers.index('Zespół')
+    return {links[team_column]: [row[2], row[-1]]
+            for row, links in zip(page.text_rows, page.link_rows) if links[team_column]}
+
+@_instrumented
+def take_table_results(url):
+    """
+    Function that takes a table of league from the given url
+    """
+    # Get response from url
+    response = fetch(url)
+    return results_frame(response.text)
+
+@_timed('frame')
+def results_frame(html):
+    """
+    Builds the matches table of a team from the source of its matches page (see take_table_results()).
+    """
+    headers, rows = parse_results_table(html)
 
     # Create DataFrame
     df = pd.DataFrame(rows, columns=headers)
@@ -373,43 +2004,6 @@ def extract_round(row):
         return match.group(1)
     return None
 
-def match_details(path):
-    response = requests.get(path)
-
-    soup = BeautifulSoup(response.text, 'html.parser')
-
-    # Znajdź wszystkie tabelki na stronie
-    tables = soup.find_all('table')
-
-    # Przechowaj ramki danych w liście
-    dataframes = []
-
-    # Sprawdź, czy znaleziono jakiekolwiek tabele
-    if tables:
-        # Iteruj przez wszystkie znalezione tabele
-        for table in tables:
-            # Wydziel dane z tabeli do listy słowników
-            table_data = []
-            rows = table.find_all('tr')
-
-            # Sprawdź, czy istnieje przynajmniej jeden wiersz
-            if rows:
-                header = [header.text.strip() for header in rows[0].find_all(['th', 'td'])]
-
-                # Iteruj przez pozostałe wiersze
-                for row in rows[1:]:
-                    row_data = [cell.text.strip() for cell in row.find_all(['th', 'td'])]
-                    table_data.append(dict(zip(header, row_data)))
-
-                # Przekształć dane do DataFrame
-                df = pd.DataFrame(table_data)
-                dataframes.append(df)
-
-    # Wydrukuj ramki danych
-    df = pd.concat([dataframes[1],dataframes[2]]).dropna()
-    
-    return df
-
 # Functions to gather teams data
 
 def extract_table_data(table):
@@ -439,18 +2033,24 @@ def extract_table_data(table):
 
     return table_data
 
-def extract_team(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+@_instrumented
+def extract_team(url, typed=False):
+    response = fetch(url)
+    return squad_frame(response.text, typed)
 
-    table1 = soup.find('table', {'id': 'mytxablecc'})
-    table2 = soup.find('table', {'id': 'mytxablec'})
+@_timed('frame')
+def squad_frame(html, typed=False):
+    """
+    Builds the squad table of a team from the source of its team page (see extract_team()).
+    """
+    tables = parse_squad_tables(html)
 
     # Sprawdź, czy obie tabele zostały znalezione
-    if table1 and table2:
-        # Ekstrahuj dane z obu tabel
-        data1 = extract_table_data(table1)
-        data2 = extract_table_data(table2)
+    if tables['mytxablecc'] is None or tables['mytxablec'] is None:
+        raise PageError('The squad tables were not found on the team page')
+    # Ekstrahuj dane z obu tabel
+    data1 = tables['mytxablecc']
+    data2 = tables['mytxablec']
 
     # Połącz dane z obu tabel w jedną listę
     combined_data = data1 + data2
@@ -461,6 +2061,8 @@ def extract_team(url):
        'Asysty', 'Kanadyjcztk', 'Superstar', 'Top6', 'MVP', 'Czerwone kartki',
        'Zółte kartki', 'Stracone bramki', 'Samobój', 'Obronione karne',
        'Czyste konto', 'Gold Team','ID']
+    if typed:
+        df = apply_schema(df, 'squad')
     return df
 
 def reports_links(url):
@@ -487,113 +2089,439 @@ def adjust_team_name(string, separator='-'):
 
 # Functions to gather matches data
 
-def match_details(path):
+@_timed('frame')
+def report_players(report):
+    """
+    Builds the players table of a parsed match report: the player tables of both teams with the team name added
+    in the 'Zespół' column.
+
+    Parameters:
+    - report (dict): The output of parse_report().
+
+    Returns:
+    - pandas.DataFrame: The rows of both teams' player tables without incomplete rows.
+    """
+    # Znajdź zespoły w title
+    matches = re.search(r'\(.*?\)\s*(.+?)\s+vs\s+(.+?)\s+-', report['title'] or '')
+    if not matches or len(report['tables']) < 3:
+        raise PageError('The page is not a match report with the player tables of both teams')
+    team1 = matches[1].strip()
+    team2 = matches[2].strip()
+
+    # Przekształć tabele do ramek danych
+    dataframes = [pd.DataFrame(table_data) for table_data in report['tables']]
+
+    tab1 = dataframes[1]
+    tab1['Zespół'] = team1
+    tab2 = dataframes[2]
+    tab2['Zespół'] = team2
+
+    return pd.concat([tab1,tab2]).dropna()
+
+@_instrumented
+def match_details(path, typed=False):
     if path != None:
-        response = requests.get(path)
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Znajdź wszystkie tabelki na stronie
-        tables = soup.find_all('table')
-
-        # Znajdź zespoły w title
-        title_content = soup.title.string
-        matches = re.search(r'\(.*?\)\s*(.+?)\s+vs\s+(.+?)\s+-', title_content)
-        if matches:
-            team1 = matches[1].strip()
-            team2 = matches[2].strip()
-
-        # Przechowaj ramki danych w liście
-        dataframes = []
-
-        # Sprawdź, czy znaleziono jakiekolwiek tabele
-        if tables:
-            # Iteruj przez wszystkie znalezione tabele
-            for table in tables:
-                # Wydziel dane z tabeli do listy słowników
-                table_data = []
-                rows = table.find_all('tr')
-
-                # Sprawdź, czy istnieje przynajmniej jeden wiersz
-                if rows:
-                    header = [header.text.strip() for header in rows[0].find_all(['th', 'td'])]
-
-                    # Iteruj przez pozostałe wiersze
-                    for row in rows[1:]:
-                        row_data = [cell.text.strip() for cell in row.find_all(['th', 'td'])]
-                        table_data.append(dict(zip(header, row_data)))
-
-                    # Przekształć dane do DataFrame
-                    df = pd.DataFrame(table_data)
-                    dataframes.append(df)
-
-        # Wydrukuj ramki danych
-        tab1 = dataframes[1]
-        tab1['Zespół'] = team1
-        tab2 = dataframes[2]
-        tab2['Zespół'] = team2
-
-        df = pd.concat([tab1,tab2]).dropna()
+        df = report_players(parsed_report(path))
+        if typed:
+            df = apply_schema(df, 'report')
     else:
         df = None
     return df
 
-def get_matches_links(league, team):
-    # Inicjalizuj listy, do których będziemy dodawać dane
-    links = table_of_links(league)
+def parsed_report(link):
+    """
+    Downloads and parses a match report (see parse_report()). Within a league_scope() every report is downloaded
+    and parsed once, however many team pages lead to it: reports are identified by report_id() and, when two
+    addresses still lead to the same page, by a hash of its content.
+
+    Parameters:
+    - link (str): The address of the match report.
+
+    Returns:
+    - dict: The output of parse_report(). Treat it as read-only, it may be shared.
+    """
+    with _league_lock:
+        if not _league_scope_depth:
+            return parse_report(fetch(link).text)
+        key = report_id(link)
+        lock = _report_locks.setdefault(key, threading.Lock())
+
+    # Obie drużyny mogą prosić o ten sam raport jednocześnie, pobiera go tylko pierwsza
+    with lock:
+        with _league_lock:
+            report = _reports.get(key)
+        if report is not None:
+            return report
+        response = fetch(link)
+        digest = hashlib.sha1(response.content).hexdigest()
+        with _league_lock:
+            report = _report_hashes.get(digest)
+        if report is None:
+            report = parse_report(response.text)
+        with _league_lock:
+            if _league_scope_depth:
+                _report_hashes.setdefault(digest, report)
+                _reports[key] = report
+        return report
+
+def report_id(link):
+    """
+    Returns the identifier of a match report, i.e. the last numeric part of its address.
+
+    Parameters:
+    - link (str): The address of the match report.
+
+    Returns:
+    - str: The report identifier, or the whole path when the address contains no number.
+    """
+    numbers = re.findall(r'\d+', urlsplit(link).path)
+    return numbers[-1] if numbers else urlsplit(link).path
+
+def report_record(link):
+    """
+    Downloads a match report once and returns both its metadata and its players table.
+
+    Parameters:
+    - link (str): The address of the match report.
+
+    Returns:
+    - dict: Keys 'match_id', 'link', 'kolejka', 'data', 'godzina', 'gospodarz', 'wynik', 'gosc' and 'players'
+      (the DataFrame returned by match_details()). Metadata that cannot be read from the page is None.
+    """
+    return _report_record(link, parsed_report(link))
+
+def report_page_record(link, html):
+    """
+    Builds the report_record() of a match report from the source of its page.
+    """
+    return _report_record(link, parse_report(html))
+
+def _report_record(link, report):
+    record = {'match_id': report_id(link), 'link': link, 'kolejka': None, 'data': None, 'godzina': None,
+              'gospodarz': None, 'wynik': None, 'gosc': None}
+    match = re.match(r"Raport   - Kolejka (\d+), (\d{4}-\d{2}-\d{2} \d{2}:\d{2})", report['header'] or '')
+    if match:
+        record['kolejka'] = match[1]
+        record['data'], record['godzina'] = match[2].split()
+    if len(report['h2']) >= 3:
+        record['gospodarz'], record['wynik'], record['gosc'] = report['h2'][:3]
+    record['players'] = report_players(report)
+    return record
+
+def report_frame(record):
+    """
+    Flattens a report record into one DataFrame: the players table with the match metadata repeated in every row.
+
+    Parameters:
+    - record (dict): The output of report_record().
+
+    Returns:
+    - pandas.DataFrame: The players of both teams with the columns 'match_id', 'link', 'kolejka', 'data',
+      'godzina', 'gospodarz', 'wynik' and 'gosc' added.
+    """
+    df = record['players'].copy()
+    for key, value in record.items():
+        if key != 'players':
+            df[key] = value
+    return df.reset_index(drop=True)
+
+def iter_match_reports(links, workers=None, errors=None):
+    """
+    Downloads the given match reports concurrently and yields each parsed report as soon as its page arrives.
+
+    Parameters:
+    - links (iterable of str): The addresses of the match reports. It is consumed lazily.
+    - workers (int or None): The maximum number of reports downloaded at once. Defaults to HTTP_CONFIG['max_workers'].
+
+    - errors (list or None): If provided, reports that fail are skipped and their envelopes (see page_result())
+      are appended to it. By default the first failure is raised.
+
+    Yields:
+    - dict: The report_record() of every report, in the order in which the pages arrive.
+    """
+    yield from iter_pages(report_record, links, workers, errors)
+
+def iter_team_reports(league, team, workers=None, ligi=ligi, season=None):
+    """
+    Yields the parsed match reports of a single team as soon as each page arrives.
+
+    Parameters:
+    - league (str): The name of the league the team plays in.
+    - team (str): The name of the team.
+    - workers (int or None): The maximum number of reports downloaded at once.
+    - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+    - season (int, str or None): If provided, the league of this season is used instead (see season_leagues()).
+
+    Yields:
+    - dict: The report_record() of every match of the team.
+    """
+    links = table_of_links(league, season_leagues(season, ligi))
+    link = links.loc[links['Zespół'].str.contains(adjust_team_name(team)), 'Zespół'].iloc[0]
+    yield from iter_match_reports(reports_links(link), workers)
+
+def iter_league_reports(league, workers=None, ligi=ligi, exclude=None, season=None, errors=None):
+    """
+    Yields every match report of a league as soon as each page arrives. A match is reported on the pages of both
+    teams, but is downloaded and yielded only once.
+
+    Parameters:
+    - league (str): The name of the league.
+    - workers (int or None): The maximum number of pages downloaded at once.
+    - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+    - exclude (iterable of str or None): Report identifiers (see report_id()) that are skipped, e.g. the reports
+      processed in an earlier run.
+    - season (int, str or None): If provided, the league of this season is used instead (see season_leagues()).
+    - errors (list or None): If provided, team pages and reports that fail are skipped and their envelopes (see
+      page_result()) are appended to it. By default the first failure is raised.
+
+    Yields:
+    - dict: The report_record() of every match of the league.
+    """
+    ligi = season_leagues(season, ligi)
+    seen = set(exclude or ())
+
+    def new_links():
+        for links in iter_pages(reports_links, table_of_links(league, ligi)['Zespół'], workers, errors):
+            for link in links:
+                if report_id(link) not in seen:
+                    seen.add(report_id(link))
+                    yield link
+
+    yield from iter_match_reports(new_links(), workers, errors)
+
+def iter_report_chunks(records, size=100):
+    """
+    Groups streamed report records into DataFrame chunks built with report_frame().
+
+    Parameters:
+    - records (iterable of dict): Report records, e.g. from iter_league_reports().
+    - size (int): The number of reports per chunk. The last chunk may be smaller.
+
+    Yields:
+    - pandas.DataFrame: The flattened reports of each chunk.
+    """
+    chunk = []
+    for record in records:
+        chunk.append(report_frame(record))
+        if len(chunk) >= size:
+            yield pd.concat(chunk, ignore_index=True)
+            chunk = []
+    if chunk:
+        yield pd.concat(chunk, ignore_index=True)
+
+def iter_matches_links(league, team, workers=None, ligi=ligi, season=None):
+    """
+    The streaming counterpart of get_matches_links(): yields the summary of every report of a team as soon as its
+    page arrives.
+
+    Yields:
+    - dict: The report_summary() of every recognisable report, with keys 'link', 'kolejka', 'data', 'godzina',
+      'wynik' and 'przeciwnik'.
+    """
+    links = table_of_links(league, season_leagues(season, ligi))
+    link = links.loc[links['Zespół'].str.contains(adjust_team_name(team)), 'Zespół'].iloc[0]
+    for summary in iter_parallel(lambda report_link: report_summary(report_link, team), reports_links(link), workers):
+        if summary is not None:
+            yield summary
+
+def report_summary(link, team):
+    """
+    Downloads a single match report and reads its round, date, score and the opponent of the given team.
+
+    Parameters:
+    - link (str): The address of the match report.
+    - team (str): The name of the team from whose perspective the opponent is determined.
+
+    Returns:
+    - dict or None: A dictionary with keys 'link', 'kolejka', 'data', 'godzina', 'wynik' and 'przeciwnik', or None
+      when the page is not a recognisable match report.
+    """
+    report = parsed_report(link)
+
+    # Wyszukaj element z informacją o kolejce
+    if report['header'] is None:
+        return None
+
+    # Użyj wyrażenia regularnego do wyciągnięcia danych
+    match = re.match(r"Raport   - Kolejka (\d+), (\d{4}-\d{2}-\d{2} \d{2}:\d{2})", report['header'])
+    przeciwnik_element = report['h2']
+    if not match or len(przeciwnik_element) < 3:
+        return None
+
+    numer_kolejki, data_godzina = match.groups()
+    # Dodanie przeciwnika
+    przeciwnik = next(element for element in [przeciwnik_element[0].upper(), przeciwnik_element[2].upper()] if element != team.upper())
+
+    return {
+        'link': link,
+        'kolejka': numer_kolejki,
+        'data': data_godzina.split()[0],
+        'godzina': data_godzina.split()[1],
+        'wynik': przeciwnik_element[1],
+        'przeciwnik': przeciwnik,
+    }
+
+def _fixture_reports(fixtures, team, key):
+    """
+    Returns the report links of the matches of team selected by round number or opponent name in its matches table
+    (see team_fixtures() and get_matches_details()).
+    """
+    if fixtures is None:
+        return []
+    home = fixtures['Gospodarz'].astype(str).str.strip().str.upper()
+    away = fixtures['Gość'].astype(str).str.strip().str.upper()
+    team = str(team).strip().upper()
+    if isinstance(key, int) or str(key).strip().isdigit():
+        wanted = fixtures['Kol.'].astype(str).str.strip().eq(str(key).strip()) & (home.eq(team) | away.eq(team))
+    else:
+        opponent = str(key).strip().upper()
+        wanted = (home.eq(team) & away.eq(opponent)) | (away.eq(team) & home.eq(opponent))
+    return fixtures.loc[wanted, 'link'].dropna().tolist()
+
+def _report_is_wanted(summary, kolejka=None, opponent=None):
+    """
+    Checks whether a report summary describes the match selected by round number or opponent name.
+    """
+    if kolejka is not None:
+        return str(summary['kolejka']).strip() == str(kolejka).strip()
+    return str(summary['przeciwnik']).strip().upper() == str(opponent).strip().upper()
+
+@_instrumented
+@_league_scoped
+def get_matches_links(league, team, kolejka=None, opponent=None, workers=None, ligi=ligi, season=None):
+    """
+    Retrieves the match reports of a team in the given league. The report pages are downloaded concurrently.
+
+    Parameters:
+    - league (str): The name of the league the team plays in.
+    - team (str): The name of the team.
+    - kolejka (int or None): If provided, the crawl stops as soon as the report of this round has been found.
+    - opponent (str or None): If provided (and kolejka is not), the crawl stops as soon as the report of the match
+      against this opponent has been found.
+    - workers (int or None): The maximum number of reports downloaded at once. Defaults to HTTP_CONFIG['max_workers'].
+    - ligi (dict): A dictionary containing league names as keys and their corresponding URLs as values.
+    - season (int, str or None): If provided, the league of this season is used instead (see season_leagues()).
+
+    Returns:
+    - pandas.DataFrame: A DataFrame with columns 'link', 'kolejka', 'data', 'godzina', 'wynik' and 'przeciwnik'.
+      With kolejka or opponent it may contain only the reports downloaded before the match was found.
+    """
+    links = table_of_links(league, season_leagues(season, ligi))
     link = links.loc[links['Zespół'].str.contains(adjust_team_name(team)), 'Zespół'].iloc[0]
     matches_links = reports_links(link)
-    
-    links_list = []
-    kolejka_list = []
-    data_list = []
-    godzina_list = []
-    wyniki_list = []
-    przeciwnicy_list = []
-
-    # Iteruj po linkach
-    for link in matches_links:
-        # Pobierz zawartość strony
-        response = requests.get(link)
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Wyszukaj element z informacją o kolejce
-        kolejka_element = soup.find('div', class_='BoxHeaderTitle')
-
-        if kolejka_element:
-            # Pobierz tekst
-            tekst_kolejki = kolejka_element.get_text(strip=True)
-
-            # Użyj wyrażenia regularnego do wyciągnięcia danych
-            match = re.match(r"Raport   - Kolejka (\d+), (\d{4}-\d{2}-\d{2} \d{2}:\d{2})", tekst_kolejki)
-
-            if match:
-                numer_kolejki, data_godzina = match.groups()
-
-                # Dodaj dane do odpowiednich list
-                links_list.append(link)
-                kolejka_list.append(numer_kolejki)
-                data_list.append(data_godzina.split()[0])
-                godzina_list.append(data_godzina.split()[1])
-
-                przeciwnik_element = soup.find_all('h2')
-        
-        if przeciwnik_element:
-            
-            wyniki_list.append(przeciwnik_element[1].text.strip())
-            # Dodanie przeciwnika
-            przeciwnik = next(element for element in [przeciwnik_element[0].text.strip().upper(), przeciwnik_element[2].text.strip().upper()] if element != team.upper())
-            przeciwnicy_list.append(przeciwnik)
+    workers = workers or HTTP_CONFIG['max_workers']
+
+    def summary(report_link):
+        return report_summary(report_link, team)
+
+    if kolejka is None and opponent is None:
+        summaries = parallel_map(summary, matches_links, workers)
+    else:
+        # Pobieraj raporty partiami i zakończ, gdy szukany mecz zostanie znaleziony
+        summaries = []
+        for start in range(0, len(matches_links), workers):
+            batch = parallel_map(summary, matches_links[start:start + workers], workers)
+            summaries.extend(batch)
+            if any(row is not None and _report_is_wanted(row, kolejka, opponent) for row in batch):
+                break
 
     # Stwórz DataFrame z zebranych danych
-    df = pd.DataFrame({
-        'link': links_list,
-        'kolejka': kolejka_list,
-        'data': data_list,
-        'godzina': godzina_list,
-        'wynik': wyniki_list,
-        'przeciwnik': przeciwnicy_list
-    })
+    df = pd.DataFrame([row for row in summaries if row is not None],
+                      columns=['link', 'kolejka', 'data', 'godzina', 'wynik', 'przeciwnik'])
+
+    return df
+
+# PARSING IN PROCESSES
+
+# Page kind -> function building the parsed result from the page address and source. Only the kind crosses the
+# process boundary, so the workers look the function up in their own copy of this module.
+PAGE_PARSERS = {
+    'results': lambda url, html: results_frame(html),
+    'squad': lambda url, html: squad_frame(html),
+    'report': report_page_record,
+    'links': lambda url, html: parse_links(html),
+}
+
+# Process pool shared by parse_pages() calls made inside parse_pool()
+_parse_pool = None
+
+def process_context():
+    """
+    Returns the multiprocessing context in which worker processes are started (see PARSER_CONFIG['start_method']).
+    The workers are never forked from this process: pools start them on the first submit, which comes from a
+    download thread, and a fork made while other threads hold urllib3, import or rate limit locks can deadlock.
+    The workers look the parsers up by kind, so they need nothing inherited.
+    """
+    import multiprocessing
+    method = PARSER_CONFIG['start_method']
+    if method not in multiprocessing.get_all_start_methods():
+        method = 'spawn'
+    return multiprocessing.get_context(method)
+
+@contextmanager
+def parse_pool(processes=None):
+    """
+    Context manager keeping one pool of worker processes open for all parse_pages() calls made inside it, so a bulk
+    run starts the workers once.
+
+    Parameters:
+    - processes (int or None): The number of worker processes. Defaults to PARSER_CONFIG['processes'] or the number
+      of CPU cores.
+    """
+    global _parse_pool
+    if _parse_pool is not None:
+        yield _parse_pool
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=processes or PARSER_CONFIG['processes'] or os.cpu_count(),
+                             mp_context=process_context()) as pool:
+        _parse_pool = pool
+        try:
+            yield pool
+        finally:
+            _parse_pool = None
+
+@_instrumented
+def parse_pages(kind, urls, workers=None, processes=None, errors=None):
+    """
+    Downloads pages in a thread pool and parses them in a pool of worker processes, so parsing is not limited to
+    one core by the GIL. The workers receive the raw page bytes and send back only the parsed result.
 
-    # Wyświetl ostateczną tabelkę
-    return df
\ No newline at end of file
+    Parameters:
+    - kind (str): The kind of the pages, one of PAGE_PARSERS: 'results' (matches pages, as take_table_results()),
+      'squad' (team pages, as extract_team()), 'report' (match reports, as report_record()) or 'links'.
+    - urls (iterable of str): The addresses of the pages.
+    - workers (int or None): The maximum number of pages downloaded at once. Defaults to HTTP_CONFIG['max_workers'].
+    - processes (int or None): The number of worker processes when no parse_pool() is open. Defaults to
+      PARSER_CONFIG['processes'] or the number of CPU cores.
+    - errors (list or None): If provided, pages that fail to download or parse are skipped and their envelopes
+      (see page_result()) are appended to it. By default the first failure is raised.
+
+    Returns:
+    - list: The parsed result of every page, in the order of urls.
+    """
+    if kind not in PAGE_PARSERS:
+        raise ValueError(f'Unknown page kind {kind!r}, choose one of {list(PAGE_PARSERS)}')
+    backend = parser_backend()
+    with parse_pool(processes) as pool:
+        def fetch_and_submit(url):
+            response = fetch(url)
+            encoding = response.encoding or response.apparent_encoding
+            return pool.submit(_parse_in_worker, kind, url, response.content, encoding, backend)
+
+        # Parsing starts as soon as each page arrives; the results are collected in the order of urls
+        futures = map_pages(fetch_and_submit, urls, workers, errors)
+        if errors is None:
+            return [future.result() for _, future in futures]
+        results = []
+        for url, future in futures:
+            try:
+                results.append(future.result())
+            except Exception as error:
+                errors.append({'url': url, 'status': 'error', 'value': None, 'error': repr(error), 'attempts': 1})
+        return results
+
+def _parse_in_worker(kind, url, content, encoding, backend):
+    # Decoded the same way as requests.Response.text, with the parser backend of the parent process
+    PARSER_CONFIG['backend'] = backend
+    return PAGE_PARSERS[kind](url, str(content, encoding or 'utf-8', errors='replace'))